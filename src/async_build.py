@@ -0,0 +1,223 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from build_site import (
+    BuildResult,
+    PAGE_ERRORS,
+    content_hash,
+    failed_page,
+    finish_build,
+    get_block_cache,
+    get_document_cache,
+    plan_build,
+    render_body,
+    split_failed,
+    template_hash,
+    template_values,
+    update_document_cache,
+    write_output,
+)
+from template import load_template
+
+# -------------------------------------------------------------------------
+# Building through an asyncio pipeline
+#
+#   read (threads) -> read queue -> render (processes) -> write queue -> write (threads)
+#
+# Reading sources, rendering them and writing the HTML overlap instead of
+# running one page after the other. Pages travel in batches, so the hand-off
+# between stages is paid once per batch instead of once per page. Both
+# queues are bounded: a stage that runs ahead waits for the next one, and
+# at most 2 * queue_size batches (plus the ones being rendered) are held in
+# memory whatever the size of the site.
+#
+# A page that fails at any stage becomes its failed_page dict, which the
+# later stages pass along as it is, and the build goes on without it.
+#
+# With more than one job, worker processes read and write their own batches
+# (render_batch): only paths go to a worker and only page dicts come back,
+# markdown and HTML are never pickled between processes. The read and write
+# stages then just pass batches along.
+# -------------------------------------------------------------------------
+
+def read_sources(batch):
+    # [(source, destination, data, source hash)] for a batch of pages
+    sources = []
+    for source, destination in batch:
+        try:
+            with open(source, "rb") as f:
+                data = f.read()
+        except OSError as error:
+            sources.append(failed_page(source, destination, error))
+            continue
+        sources.append((source, destination, data, content_hash(data)))
+    return sources
+
+
+def render_sources(sources, block_cache_dir=None, template_path=None, document_cache_path=None):
+    # Runs in the render pool: [(source, destination, source hash, HTML,
+    # block cache hits, misses, HTML for the document cache, document cache
+    # hit, seconds)]
+    cache = get_block_cache(block_cache_dir)
+    documents = get_document_cache(document_cache_path)
+    template = load_template(template_path) if template_path is not None else None
+    rendered = []
+    for page in sources:
+        if isinstance(page, dict):
+            rendered.append(page)
+            continue
+        source, destination, data, source_hash = page
+        start = time.perf_counter()
+        hits, misses = cache.hits, cache.misses
+        document_hits = documents.hits if documents else 0
+        try:
+            text = data.decode("utf-8")
+            if documents is None:
+                html, document = cache.markdown_to_html(text), None
+            else:
+                html, document = render_body(text, source_hash, cache, documents)
+            if template is not None:
+                html = template.render(template_values(text, html))
+        except PAGE_ERRORS as error:
+            rendered.append(failed_page(source, destination, error))
+            continue
+        rendered.append((source, destination, source_hash, html, cache.hits - hits, cache.misses - misses,
+                         document, documents is not None and documents.hits > document_hits,
+                         time.perf_counter() - start))
+    return rendered
+
+
+def write_outputs(rendered):
+    # The same page dicts as render_page returns
+    pages = []
+    for page in rendered:
+        if isinstance(page, dict):
+            pages.append(page)
+            continue
+        source, destination, source_hash, html, hits, misses, document, document_hit, seconds = page
+        try:
+            with write_output(destination) as f:
+                f.write(html)
+        except OSError as error:
+            pages.append(failed_page(source, destination, error))
+            continue
+        pages.append({
+            "source": source,
+            "output": destination,
+            "source_hash": source_hash,
+            "output_hash": content_hash(html.encode("utf-8")),
+            "block_hits": hits,
+            "block_misses": misses,
+            "document": document,
+            "document_hit": document_hit,
+            "seconds": seconds,
+        })
+    return pages
+
+
+def render_batch(batch, block_cache_dir=None, template_path=None, document_cache_path=None):
+    # Runs in a worker process: reads, renders and writes a batch of
+    # (source, destination) pages and returns their page dicts
+    return write_outputs(render_sources(read_sources(batch), block_cache_dir, template_path, document_cache_path))
+
+
+async def read_stage(batches, read_queue, io_pool, renderers, read):
+    loop = asyncio.get_running_loop()
+    for batch in batches:
+        if read is not None:
+            batch = await loop.run_in_executor(io_pool, read, batch)
+        await read_queue.put(batch)
+    # One stop marker per renderer
+    for _ in range(renderers):
+        await read_queue.put(None)
+
+
+async def render_stage(read_queue, write_queue, render_pool, render, block_cache_dir, template_path,
+                       document_cache_path):
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = await read_queue.get()
+        if batch is None:
+            await write_queue.put(None)
+            return
+        await write_queue.put(await loop.run_in_executor(render_pool, render, batch, block_cache_dir,
+                                                           template_path, document_cache_path))
+
+
+async def write_stage(write_queue, io_pool, renderers, write, pages):
+    loop = asyncio.get_running_loop()
+    finished = 0
+    while finished < renderers:
+        rendered = await write_queue.get()
+        if rendered is None:
+            finished += 1
+            continue
+        if write is not None:
+            rendered = await loop.run_in_executor(io_pool, write, rendered)
+        pages.extend(rendered)
+
+
+async def render_pages(pages, jobs=None, queue_size=8, batch_size=16, block_cache_dir=None,
+                       template_path=None, document_cache_path=None):
+    workers = jobs or os.cpu_count() or 1
+    # Keep every worker busy while its next batch waits for it
+    renderers = workers * 2
+    read_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+    batches = [pages[index:index + batch_size] for index in range(0, len(pages), batch_size)]
+    rendered = []
+
+    if workers == 1:
+        # jobs=1 renders in a thread of this process, which still lets file
+        # reads and writes run while it parses
+        render_pool = ThreadPoolExecutor(max_workers=1)
+        read, render, write = read_sources, render_sources, write_outputs
+    else:
+        render_pool = ProcessPoolExecutor(max_workers=workers)
+        read, render, write = None, render_batch, None
+    with render_pool, ThreadPoolExecutor(max_workers=2) as io_pool:
+        await asyncio.gather(
+            read_stage(batches, read_queue, io_pool, renderers, read),
+            *(render_stage(read_queue, write_queue, render_pool, render, block_cache_dir, template_path,
+                           document_cache_path)
+              for _ in range(renderers)),
+            write_stage(write_queue, io_pool, renderers, write, rendered),
+        )
+    return rendered
+
+
+def async_build_site(content_dir="content", public_dir="public", jobs=None, force=False,
+                     block_cache_dir=None, queue_size=8, batch_size=16, template_path=None,
+                     document_cache_path=None):
+    # Builds like build_site (same output, manifest and BuildResult), with
+    # reading, rendering and writing overlapped. batch_size pages move
+    # between stages together, queue_size bounds the batches waiting
+    # between two stages.
+    if queue_size < 1 or batch_size < 1:
+        raise ValueError("queue_size and batch_size must be at least 1")
+    start = time.perf_counter()
+    page_template = template_hash(template_path)
+    old_manifest, manifest, skipped, pages, stats = plan_build(content_dir, public_dir, force, page_template)
+
+    results = []
+    if pages:
+        results = asyncio.run(render_pages(pages, jobs, queue_size, batch_size, block_cache_dir,
+                                           template_path, document_cache_path))
+    # Batches finish in any order, report pages in source order like build_site
+    order = {source: index for index, (source, destination) in enumerate(pages)}
+    results.sort(key=lambda page: order[page["source"]])
+
+    rendered, failed = split_failed(results)
+    removed = finish_build(content_dir, public_dir, old_manifest, manifest, rendered, stats, page_template,
+                           failed)
+    if document_cache_path is not None:
+        update_document_cache(document_cache_path, manifest, rendered)
+    return BuildResult(
+        [page["output"] for page in rendered], time.perf_counter() - start, skipped, removed,
+        block_hits=sum(page["block_hits"] for page in rendered),
+        block_misses=sum(page["block_misses"] for page in rendered),
+        document_hits=sum(page["document_hit"] for page in rendered),
+        errors=[(page["source"], page["error"]) for page in failed],
+    )
@@ -0,0 +1,16 @@
+# -------------------------------------------------------------------------
+# Running a batch function over chunks of its inputs in an executor
+# -------------------------------------------------------------------------
+
+def map_chunks(executor, func, items, chunksize):
+    # func(items[i:i + chunksize]) for every chunk, run in executor (a
+    # thread or process pool, func must be picklable for the latter) and
+    # joined back into one list in input order
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    items = list(items)
+    chunks = [items[index:index + chunksize] for index in range(0, len(items), chunksize)]
+    results = []
+    for chunk_results in executor.map(func, chunks):
+        results.extend(chunk_results)
+    return results
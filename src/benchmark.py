@@ -0,0 +1,1127 @@
+import argparse
+import html
+import json
+import os
+import pickle
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from htmlnode import HTMLNode, LeafNode, ParentNode, escape_html
+from async_build import async_build_site, read_sources, render_batch, render_sources
+from build_site import build_site, output_path
+from dev_server import DevSite, make_watcher
+from markdown_blocks import (
+    BlockType,
+    block_to_block_type,
+    block_to_html,
+    block_to_html_node,
+    extract_title,
+    iter_markdown_blocks,
+    markdown_to_blocks,
+    markdown_to_blocks_many,
+    markdown_to_html,
+    markdown_to_html_node,
+)
+from template import load_template
+from textnode import TextType, TextNode, TextNodeView, text_node_to_html_node, text_nodes_to_html
+from inline_markdown import (
+    _IMAGE_RE,
+    _LINK_RE,
+    extract_markdown_links,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+    text_to_textnodes_many,
+)
+
+# -----------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------
+
+def best_time(func, *args, repeat=3):
+    # Best of `repeat` runs, in seconds
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def make_paragraph(size):
+    # A long paragraph of about `size` characters mixing every inline element
+    chunk = (
+        "Plain words then **bold words** and _italic words_ with `some code` "
+        "and an ![image](https://i.imgur.com/zjjcJKZ.png) and a [link](https://boot.dev). "
+    )
+    return chunk * (size // len(chunk) + 1)
+
+
+def peak_memory(func, *args):
+    # Peak traced allocation while running func, in bytes
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def make_page_tree(size):
+    # A page of nested sections with about `size` characters of text
+    paragraph = ParentNode("p", [
+        LeafNode(None, "Some plain text followed by "),
+        LeafNode("b", "bold text"),
+        LeafNode(None, " and a "),
+        LeafNode("a", "link", props={"href": "https://boot.dev"}),
+    ])
+    per_paragraph = len(paragraph.to_html())
+    sections = [
+        ParentNode("section", [ParentNode("div", [paragraph] * 10)])
+        for _ in range(max(1, size // (per_paragraph * 10)))
+    ]
+    return ParentNode("main", sections)
+
+
+def report(name, seconds, size):
+    mb_per_s = size / seconds / 1_000_000 if seconds else float("inf")
+    print(f"{name:<40} {seconds * 1000:10.2f} ms {mb_per_s:10.2f} MB/s")
+
+# -----------------------------------------------------------------------
+# Inline parsing
+# -----------------------------------------------------------------------
+
+def five_pass_text_to_textnodes(text):
+    # The old text_to_textnodes pipeline, kept to compare against
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def find_split_nodes_link(old_nodes):
+    # The old split_nodes_link that searched for every match again, kept to
+    # compare against
+    new_nodes = []
+
+    for node in old_nodes:
+        if node.text_type != TextType.TEXT:
+            new_nodes.append(node)
+            continue
+
+        text = node.text
+        links = extract_markdown_links(text)
+
+        if not links:
+            new_nodes.append(node)
+            continue
+
+        current_index = 0
+
+        for label, url in links:
+            pattern = f"[{label}]({url})"
+
+            link_start = text.find(pattern,current_index)
+            if link_start == -1:
+                continue
+            link_end = link_start + len(pattern)
+
+            #text before the link
+            if current_index < link_start:
+                before = text[current_index: link_start]
+                new_nodes.append(TextNode(before, TextType.TEXT))
+
+            # the link node
+            new_nodes.append(TextNode(label, TextType.LINK, url))
+
+            current_index = link_end
+
+        # leftover text after last link
+        if current_index < len(text):
+            after = text[current_index: len(text)]
+            new_nodes.append(TextNode(after, TextType.TEXT))
+
+    return new_nodes
+
+
+def bench_split_nodes_link(size):
+    text = make_link_text(size)
+    nodes = [TextNode(text, TextType.TEXT)]
+    old = best_time(find_split_nodes_link, nodes)
+    new = best_time(split_nodes_link, nodes)
+    report("split_nodes_link (findall + find)", old, len(text))
+    report("split_nodes_link (finditer spans)", new, len(text))
+    print(f"speedup: {old / new:.2f}x")
+
+
+def bench_text_to_textnodes(size):
+    text = make_paragraph(size)
+    old = best_time(five_pass_text_to_textnodes, text)
+    new = best_time(text_to_textnodes, text)
+    report("text_to_textnodes (five passes)", old, len(text))
+    report("text_to_textnodes (single pass)", new, len(text))
+    print(f"speedup: {old / new:.2f}x")
+
+
+# -----------------------------------------------------------------------
+# Batch APIs
+# -----------------------------------------------------------------------
+
+SHORT_BLOCKS = (
+    "A short paragraph without any markup.",
+    "Some **bold** words",
+    "an item",
+    "See [the docs](https://boot.dev/docs) for _more_",
+    "Call `main()` first",
+    "Another plain line of text",
+)
+
+BATCH_SIZES = (1, 10, 100, 1_000, 10_000, 100_000)
+
+
+def batch_throughput(run, batch, items):
+    # Items per second when `items` inputs are processed `batch` at a time
+    calls = max(1, items // len(batch))
+    seconds = best_time(lambda: [run(batch) for _ in range(calls)])
+    return calls * len(batch) / seconds
+
+
+def bench_batches(size, items=100_000):
+    # Throughput curves of the batch APIs against one call per input, for
+    # batch sizes from 1 to 100,000. Pools get fewer items per point, one
+    # round trip per batch makes their small batches slow.
+    texts = [SHORT_BLOCKS[index % len(SHORT_BLOCKS)] for index in range(max(BATCH_SIZES))]
+    page = "# Title\n\nA short page with **bold** text.\n\n- one\n- two\n"
+    pages = [page] * max(BATCH_SIZES)
+    workers = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as threads, ProcessPoolExecutor(max_workers=workers) as processes:
+        runs = (
+            ("text_to_textnodes per text", texts, lambda batch: [text_to_textnodes(text) for text in batch], items),
+            ("text_to_textnodes_many", texts, text_to_textnodes_many, items),
+            ("text_to_textnodes_many, threads", texts,
+             lambda batch: text_to_textnodes_many(batch, threads), items // 10),
+            ("text_to_textnodes_many, processes", texts,
+             lambda batch: text_to_textnodes_many(batch, processes), items // 10),
+            ("markdown_to_blocks per page", pages, lambda batch: [markdown_to_blocks(page) for page in batch], items),
+            ("markdown_to_blocks_many", pages, markdown_to_blocks_many, items),
+            ("markdown_to_blocks_many, processes", pages,
+             lambda batch: markdown_to_blocks_many(batch, processes), items // 10),
+        )
+        print(f"{'items/s by batch size':<36}" + "".join(f"{batch_size:>10}" for batch_size in BATCH_SIZES))
+        for name, inputs, run, count in runs:
+            rates = [batch_throughput(run, inputs[:batch_size], count) for batch_size in BATCH_SIZES]
+            print(f"{name:<36}" + "".join(f"{rate:10.0f}" for rate in rates))
+    print(f"({workers} workers per pool)")
+
+
+# -----------------------------------------------------------------------
+# Text node views
+# -----------------------------------------------------------------------
+
+def copying_split_nodes_delimiter(old_nodes, delimiter, text_type):
+    # split_nodes_delimiter before it made views, kept to compare against
+    new_nodes = []
+    for node in old_nodes:
+        if node.text_type != TextType.TEXT:
+            new_nodes.append(node)
+            continue
+        parts = node.text.split(delimiter)
+        if len(parts) % 2 == 0:
+            parts[-2:] = [parts[-2] + delimiter + parts[-1]]
+        for i, part in enumerate(parts):
+            if part:
+                new_nodes.append(TextNode(part, TextType.TEXT if i % 2 == 0 else text_type))
+    return new_nodes
+
+
+def copying_split_nodes_by_pattern(old_nodes, pattern, text_type):
+    # split_nodes_by_pattern before it made views, kept to compare against
+    new_nodes = []
+    for node in old_nodes:
+        if node.text_type != TextType.TEXT:
+            new_nodes.append(node)
+            continue
+        text = node.text
+        current_index = 0
+        for match in pattern.finditer(text):
+            if current_index < match.start():
+                new_nodes.append(TextNode(text[current_index:match.start()], TextType.TEXT))
+            label, url = match.groups()
+            new_nodes.append(TextNode(label, text_type, url))
+            current_index = match.end()
+        if current_index == 0:
+            new_nodes.append(node)
+        elif current_index < len(text):
+            new_nodes.append(TextNode(text[current_index:], TextType.TEXT))
+    return new_nodes
+
+
+def copying_five_pass_text_to_textnodes(text):
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = copying_split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = copying_split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = copying_split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = copying_split_nodes_by_pattern(nodes, _IMAGE_RE, TextType.IMAGE)
+    nodes = copying_split_nodes_by_pattern(nodes, _LINK_RE, TextType.LINK)
+    return nodes
+
+
+def viewing_five_pass_text_to_textnodes(text):
+    # The same passes starting from a view of the whole text: a plain
+    # TextNode is split into copies, a view into views
+    nodes = [TextNodeView(text, 0, len(text), TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def traced_memory(func, *args):
+    # (peak, still allocated while the result is alive) in bytes
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+        return peak, current
+    finally:
+        tracemalloc.stop()
+
+
+def make_sparse_paragraph(size):
+    # Long runs of plain text with a little markup between them
+    chunk = "plain words " * 200 + "**bold** and _italic_ and a [link](https://boot.dev) "
+    return chunk * (size // len(chunk) + 1)
+
+
+def bench_text_node_views(size):
+    # Bytes allocated per MB of markdown by five split passes that copy
+    # every piece, the same passes making views of long pieces, and the
+    # single pass scanner
+    parsers = (
+        ("five passes, copies", copying_five_pass_text_to_textnodes),
+        ("five passes, views", viewing_five_pass_text_to_textnodes),
+        ("single pass", text_to_textnodes),
+    )
+    for corpus, make_text in (("dense markup", make_paragraph), ("long plain runs", make_sparse_paragraph)):
+        text = make_text(size)
+        megabytes = len(text) / 1_000_000
+        print(corpus)
+        for name, parse in parsers:
+            peak, retained = traced_memory(parse, text)
+            parse_seconds = best_time(parse, text)
+            render_seconds = best_time(lambda: text_nodes_to_html(parse(text)))
+            print(f"  {name:<22} peak {peak / megabytes / 1_000_000:6.2f} MB/MB  "
+                  f"nodes {retained / megabytes / 1_000_000:6.2f} MB/MB  "
+                  f"parse {parse_seconds * 1000:8.2f} ms  parse+render {render_seconds * 1000:8.2f} ms")
+
+
+# Inputs that used to raise, or that make the delimiter stack do the most
+# work, each about `size` characters long
+def repeat_to(chunk, size):
+    return chunk * (size // len(chunk) + 1)
+
+
+ADVERSARIAL_TEXTS = {
+    # Every other opener is dropped by the pair around it
+    "discarded openers": lambda size: repeat_to("_a **b ", size),
+    # Bold inside italic and italic inside bold
+    "nested emphasis": lambda size: repeat_to("_a **b** c_ **d _e_ f** ", size),
+    # A backtick that never closes, with delimiters after it
+    "lone backtick": lambda size: "`" + repeat_to(" a ** b _ c", size),
+    # Runs of stars that are not "**" and odd underscores
+    "stray stars": lambda size: repeat_to("a *** b * c ", size) + "_",
+    # Brackets that are never a link, between delimiters, on one line
+    "unclosed brackets": lambda size: repeat_to("as shown in [1] and **also** in [2], see _notes_. ", size),
+    "bracket before delimiter": lambda size: repeat_to("[a _ ", size),
+}
+
+
+def bench_adversarial_delimiters(size):
+    # Linear scanning: four times the text should take about four times as long
+    for name, make_text in ADVERSARIAL_TEXTS.items():
+        small = make_text(size)
+        large = make_text(size * 4)
+        small_seconds = best_time(text_to_textnodes, small)
+        large_seconds = best_time(text_to_textnodes, large)
+        report(name, small_seconds, len(small))
+        print(f"{'':<40} 4x input: {large_seconds / small_seconds:5.2f}x time")
+
+
+# -----------------------------------------------------------------------
+# Node conversion
+# -----------------------------------------------------------------------
+
+def if_chain_text_node_to_html_node(text_node):
+    # The old text_node_to_html_node, kept to compare against
+    if text_node.text_type == TextType.TEXT:
+        return LeafNode(None, text_node.text)
+    elif text_node.text_type == TextType.BOLD:
+        return LeafNode("b", text_node.text)
+    elif text_node.text_type == TextType.ITALIC:
+        return LeafNode("i", text_node.text)
+    elif text_node.text_type == TextType.CODE:
+        return LeafNode("code", text_node.text)
+    elif text_node.text_type == TextType.LINK:
+        return LeafNode("a", text_node.text, props={"href": text_node.url})
+    elif text_node.text_type == TextType.IMAGE:
+        return LeafNode("img", "", props={"src": text_node.url, "alt": text_node.text})
+    else:
+        raise ValueError(f"Unsupported TextType")
+
+
+def bench_text_node_conversion(size):
+    nodes = text_to_textnodes(make_paragraph(size))
+    html_size = len(text_nodes_to_html(nodes))
+    cases = (
+        ("if/elif chain + LeafNode.to_html",
+         lambda: "".join(if_chain_text_node_to_html_node(node).to_html() for node in nodes)),
+        ("dispatch table + LeafNode.to_html",
+         lambda: "".join(text_node_to_html_node(node).to_html() for node in nodes)),
+        ("text_nodes_to_html (no LeafNode)",
+         lambda: text_nodes_to_html(nodes)),
+    )
+    for name, func in cases:
+        report(name, best_time(func), html_size)
+
+
+# -----------------------------------------------------------------------
+# HTML rendering
+# -----------------------------------------------------------------------
+
+def write_to_html(node, path):
+    with open(path, "w") as f:
+        f.write(node.to_html())
+
+
+def write_html(node, path):
+    with open(path, "w") as f:
+        node.write_html(f)
+
+
+def bench_write_html(size):
+    node = make_page_tree(size)
+    fd, path = tempfile.mkstemp(suffix=".html")
+    os.close(fd)
+    try:
+        for name, func in (("to_html + write", write_to_html), ("write_html (streaming)", write_html)):
+            seconds = best_time(func, node, path)
+            peak = peak_memory(func, node, path)
+            report(name, seconds, os.path.getsize(path))
+            print(f"{'':<40} peak memory {peak / 1_000_000:10.2f} MB")
+    finally:
+        os.remove(path)
+
+
+def recursive_to_html(node):
+    # The old recursive ParentNode.to_html, kept to compare against
+    if isinstance(node, LeafNode):
+        return node.to_html()
+    children_html = "".join(recursive_to_html(child) for child in node.children)
+    return f"<{node.tag}{node.props_to_html()}>{children_html}</{node.tag}>"
+
+
+def make_deep_tree(depth):
+    node = LeafNode("b", "deep")
+    for _ in range(depth):
+        node = ParentNode("blockquote", [node])
+    return node
+
+
+def make_wide_tree(width):
+    return ParentNode("ul", [LeafNode("li", "item")] * width)
+
+
+def bench_render_depth(size, depth=10_000, width=1_000_000):
+    for shape, node in ((f"deep ({depth} levels)", make_deep_tree(depth)),
+                        (f"wide ({width} children)", make_wide_tree(width))):
+        html_size = len(node.to_html())
+        try:
+            report(f"recursive, {shape}", best_time(recursive_to_html, node), html_size)
+        except RecursionError:
+            print(f"{'recursive, ' + shape:<40} RecursionError")
+        report(f"explicit stack, {shape}", best_time(node.to_html), html_size)
+
+
+# -----------------------------------------------------------------------
+# Block splitting
+# -----------------------------------------------------------------------
+
+def make_document(size):
+    # A markdown document of about `size` characters with every block type
+    chunk = (
+        "# A heading\n\n"
+        "A paragraph with **bold** text\nthat spans two lines.\n\n"
+        "- a list\n- of items\n\n"
+        "1. an ordered\n2. list\n\n"
+        "> a quote\n> on two lines\n\n"
+        "```\nsome code\n```\n\n"
+    )
+    return chunk * (size // len(chunk) + 1)
+
+
+def four_split_block_to_block_type(block):
+    # The old block_to_block_type, kept to compare against
+    # Check for heading (1-6 # characters, followed by space)
+    heading_prefixes = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
+    if block.startswith(heading_prefixes):
+        return BlockType.HEADING
+    
+    # Check for code block (starts with ''' and new line, ends with ''')   
+    lines = block.split('\n')
+    if len(lines) > 1 and lines[0] == ("```") and lines[-1] == ("```"):
+        return BlockType.CODE
+
+    # Check for quote block (every line starts with >)
+    lines = block.split("\n")
+    is_quote = True
+
+    for line in lines:
+        leading_white_spaces_stripped_line = line.lstrip()
+        if leading_white_spaces_stripped_line:
+            first_non_space_character = leading_white_spaces_stripped_line[0]
+        
+            if first_non_space_character != ">":
+                is_quote = False
+                break
+        
+        else:
+            is_quote = False
+            break
+  
+    if is_quote:
+        return BlockType.QUOTE
+    
+    # Check for unordered list (every line starts with "- ")
+    lines = block.split("\n")
+        
+    for line in lines:
+        if not line.startswith("- "):
+            break
+    else:
+        return BlockType.UNORDERED_LIST
+
+    # Check for ordered list (every line starts with "1. 2. 3. and so on")
+    lines = block.split("\n")
+
+    count = 1
+
+    for line in lines:
+        if not line.startswith(f"{count}. "):
+            break
+        count += 1
+    else:
+        return BlockType.ORDERED_LIST
+
+    
+    return BlockType.PARAGRAPH
+
+
+def bench_block_to_block_type(size):
+    blocks = markdown_to_blocks(make_document(size))
+    for name, func in (("block_to_block_type (four splits)", four_split_block_to_block_type),
+                       ("block_to_block_type (single scan)", block_to_block_type)):
+        seconds = best_time(lambda: [func(block) for block in blocks])
+        print(f"{name:<40} {seconds * 1000:10.2f} ms {len(blocks) / seconds:12.0f} blocks/s")
+
+
+# One typical block of every type
+BLOCKS_BY_TYPE = {
+    BlockType.PARAGRAPH: "A paragraph with **bold** and _italic_ text,\n`code` and a [link](https://boot.dev).",
+    BlockType.HEADING: "## A heading with **bold** text",
+    BlockType.CODE: "```\ndef main():\n    return a < b and c\n```",
+    BlockType.QUOTE: "> a quote with **bold** text\n> on two lines",
+    BlockType.UNORDERED_LIST: "- a list\n- of **three**\n- items",
+    BlockType.ORDERED_LIST: "1. an ordered\n2. list of _three_\n3. items",
+}
+
+
+def bench_block_types(size):
+    # Throughput of each BlockType's handler, on `size` characters of blocks
+    # of that type
+    for block_type, block in BLOCKS_BY_TYPE.items():
+        blocks = [block] * max(1, size // len(block))
+        total = len(block) * len(blocks)
+        tree = best_time(lambda: [block_to_html_node(block).to_html() for block in blocks])
+        fused = best_time(lambda: [block_to_html(block) for block in blocks])
+        for name, seconds in (("block_to_html_node", tree), ("block_to_html", fused)):
+            print(f"{block_type.value + ', ' + name:<40} {seconds * 1000:10.2f} ms "
+                  f"{len(blocks) / seconds:12.0f} blocks/s {total / seconds / 1_000_000:8.2f} MB/s")
+
+
+def count_blocks_in_memory(path):
+    with open(path, encoding="utf-8") as f:
+        return len(markdown_to_blocks(f.read()))
+
+
+def count_blocks_streaming(path):
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in iter_markdown_blocks(f))
+
+
+def bench_markdown_to_blocks(size):
+    fd, path = tempfile.mkstemp(suffix=".md")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(make_document(size))
+    try:
+        for name, func in (("markdown_to_blocks(f.read())", count_blocks_in_memory),
+                           ("iter_markdown_blocks(f)", count_blocks_streaming)):
+            report(name, best_time(func, path), os.path.getsize(path))
+            print(f"{'':<40} peak memory {peak_memory(func, path) / 1_000_000:10.2f} MB")
+    finally:
+        os.remove(path)
+
+
+# -----------------------------------------------------------------------
+# Node memory
+# -----------------------------------------------------------------------
+
+class DictTextNode:
+    # TextNode as it was before __slots__, kept to compare against
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictLeafNode:
+    # LeafNode as it was before __slots__, kept to compare against
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+
+def bytes_per_node(make_node, count=100_000):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        nodes = [make_node() for _ in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # The list slot holding each node is not part of the node cost
+    return (after - before) / len(nodes) - 8
+
+
+def make_page_nodes(text):
+    return ParentNode("p", [text_node_to_html_node(node) for node in text_to_textnodes(text)])
+
+
+def bench_node_memory(size, pages=10_000):
+    candidates = (
+        ("TextNode (__dict__)", lambda: DictTextNode("text", TextType.LINK, "https://boot.dev")),
+        ("TextNode (__slots__)", lambda: TextNode("text", TextType.LINK, "https://boot.dev")),
+        ("LeafNode (__dict__)", lambda: DictLeafNode("b", "bold")),
+        ("LeafNode (__slots__)", lambda: LeafNode("b", "bold")),
+    )
+    for name, make_node in candidates:
+        print(f"{name:<40} {bytes_per_node(make_node):10.1f} bytes/node")
+
+    # Keep the text nodes and the HTML tree of every page alive at once
+    page_text = make_paragraph(max(1, size // pages))
+    corpus = [(text_to_textnodes(page_text), make_page_nodes(page_text)) for _ in range(pages)]
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(f"{f'peak RSS, {len(corpus)} pages':<40} {peak_rss / 1_000_000:10.2f} MB")
+
+
+# -----------------------------------------------------------------------
+# Attributes
+# -----------------------------------------------------------------------
+
+def join_props_to_html(self):
+    # The old HTMLNode.props_to_html that joined the attributes on every
+    # call, kept to compare against
+    if not self.props:
+        return ""
+    props_str = " ".join(f'{key}="{value}"' for key, value in self.props.items())
+    return f" {props_str}"
+
+
+def make_nav_tree(size, sections=20):
+    # Site navigation: the same few links over and over, about `size`
+    # characters of HTML
+    links = max(1, size // 50)
+    return ParentNode("nav", [ParentNode("ul", [
+        ParentNode("li", [LeafNode("a", f"Section {index % sections}",
+                                   props={"href": f"/section/{index % sections}/"})])
+        for index in range(links)
+    ])])
+
+
+def bench_props_to_html(size):
+    cases = (
+        ("navigation", make_nav_tree(size)),
+        ("link-heavy page", markdown_to_html_node(make_link_text(size))),
+    )
+    for name, node in cases:
+        html_size = len(node.to_html())
+        cached = HTMLNode.props_to_html
+        HTMLNode.props_to_html = join_props_to_html
+        try:
+            old = best_time(node.to_html)
+        finally:
+            HTMLNode.props_to_html = cached
+        new = best_time(node.to_html)
+        report(f"{name} (join every call)", old, html_size)
+        report(f"{name} (cached props)", new, html_size)
+        print(f"speedup: {old / new:.2f}x")
+
+
+# -----------------------------------------------------------------------
+# Escaping
+# -----------------------------------------------------------------------
+
+PRE_ESCAPED_TAGS = {TextType.TEXT: None, TextType.BOLD: "b", TextType.ITALIC: "i", TextType.CODE: "code"}
+
+
+def pre_escaped_leaf(text_node):
+    # Escaping in Python before the text reaches the node (html.escape on
+    # each node), the way callers had to do it before nodes escaped
+    if text_node.text_type is TextType.LINK:
+        return LeafNode("a", html.escape(text_node.text), props={"href": text_node.url}, raw=True)
+    return LeafNode(PRE_ESCAPED_TAGS[text_node.text_type], html.escape(text_node.text), raw=True)
+
+
+def bench_escaping(size):
+    text = make_paragraph(size).replace(" and ", " & ").replace("then", "<then>")
+    nodes = [node for node in text_to_textnodes(text) if node.text_type is not TextType.IMAGE]
+    values = [node.text for node in nodes]
+    size = sum(len(value) for value in values)
+
+    old = best_time(lambda: [html.escape(value) for value in values])
+    new = best_time(lambda: [escape_html(value) for value in values])
+    report("html.escape per value", old, size)
+    report("escape_html per value", new, size)
+    print(f"speedup: {old / new:.2f}x")
+
+    long_value = text * 4
+    report("html.escape, one long value", best_time(html.escape, long_value), len(long_value))
+    report("escape_html, one long value", best_time(escape_html, long_value), len(long_value))
+
+    old = best_time(lambda: ParentNode("p", [pre_escaped_leaf(node) for node in nodes]).to_html())
+    new = best_time(lambda: ParentNode("p", [text_node_to_html_node(node) for node in nodes]).to_html())
+    report("html.escape, then build and render", old, size)
+    report("build and render, escaping built in", new, size)
+    print(f"speedup: {old / new:.2f}x")
+
+
+# -----------------------------------------------------------------------
+# Page templates
+# -----------------------------------------------------------------------
+
+PAGE_TEMPLATE = (
+    "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>{{ title }}</title>\n"
+    + "<link rel=\"stylesheet\" href=\"/index.css\">\n" * 20
+    + "</head>\n<body>\n<nav>" + "<a href=\"/section\">Section</a>" * 40 + "</nav>\n"
+    + "<article>{{ content }}</article>\n<footer>Built with a static site generator</footer>\n"
+    + "</body>\n</html>\n"
+)
+
+
+def replace_template(path, title, content):
+    # What every page would do without compiled templates, kept to compare
+    # against
+    with open(path, encoding="utf-8") as f:
+        template = f.read()
+    return template.replace("{{ title }}", title).replace("{{ content }}", content)
+
+
+def bench_templates(size, pages=2_000):
+    page = make_document(max(1, size // pages))
+    title = extract_title(page) or "Untitled"
+    content = markdown_to_html(page)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "template.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(PAGE_TEMPLATE)
+        total = pages * (len(PAGE_TEMPLATE) + len(content))
+
+        old = best_time(lambda: [replace_template(path, title, content) for _ in range(pages)])
+        new = best_time(lambda: [load_template(path).render({"title": title, "content": content})
+                                 for _ in range(pages)])
+        template = load_template(path)
+        compiled = best_time(lambda: [template.render({"title": title, "content": content})
+                                      for _ in range(pages)])
+    report("read + str.replace per page", old, total)
+    report("load_template + render per page", new, total)
+    report("render, template already loaded", compiled, total)
+    print(f"speedup: {old / new:.2f}x")
+
+
+# -----------------------------------------------------------------------
+# Fused rendering
+# -----------------------------------------------------------------------
+
+def tree_to_html(markdown):
+    return markdown_to_html_node(markdown).to_html()
+
+
+def bench_markdown_to_html(size):
+    markdown = make_document(size)
+    for name, func in (("markdown_to_html_node().to_html()", tree_to_html),
+                       ("markdown_to_html (fused)", markdown_to_html)):
+        report(name, best_time(func, markdown), len(markdown))
+        print(f"{'':<40} peak memory {peak_memory(func, markdown) / 1_000_000:10.2f} MB")
+
+
+# -----------------------------------------------------------------------
+# Watch mode
+# -----------------------------------------------------------------------
+
+def write_site(content, pages, page_text):
+    for index in range(pages):
+        path = os.path.join(content, f"section{index % 50}", f"page{index}.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(page_text)
+
+
+def bench_watch_rebuild(size, pages=5_000, edits=20):
+    # Time from saving a page to its HTML being rewritten, on a site of
+    # `pages` pages that was fully built before
+    page_text = make_document(max(1, size // pages))
+    with tempfile.TemporaryDirectory() as directory:
+        content = os.path.join(directory, "content")
+        public = os.path.join(directory, "public")
+        write_site(content, pages, page_text)
+        build_site(content, public)
+
+        for poll in (False, True):
+            watcher = make_watcher(content, poll=poll)
+            site = DevSite(content, public)
+            timings = []
+            try:
+                for edit in range(edits):
+                    path = os.path.join(content, f"section{edit % 50}", f"page{edit}.md")
+                    start = time.perf_counter()
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(f"# Edit {edit}\n\n{page_text}")
+                    changed = set()
+                    while path not in changed:
+                        changed |= watcher.wait(timeout=5)
+                    site.rebuild(changed)
+                    timings.append(time.perf_counter() - start)
+            finally:
+                watcher.close()
+            timings.sort()
+            name = f"save to rebuilt ({type(watcher).__name__})"
+            print(f"{name:<40} median {timings[len(timings) // 2] * 1000:8.2f} ms"
+                  f"   max {timings[-1] * 1000:8.2f} ms   ({pages} pages)")
+
+
+# -----------------------------------------------------------------------
+# Build pipelines
+# -----------------------------------------------------------------------
+
+def bench_build_pipeline(size, pages=5_000):
+    # Full (forced) builds of a `pages` page site of `size` characters
+    page_text = make_document(max(1, size // pages))
+    builds = (
+        ("build_site (sequential)", lambda content, public: build_site(content, public, jobs=1, force=True)),
+        ("async_build_site (jobs=1)", lambda content, public: async_build_site(content, public, jobs=1, force=True)),
+        ("build_site (process pool)", lambda content, public: build_site(content, public, force=True)),
+        ("async_build_site (process pool)", lambda content, public: async_build_site(content, public, force=True)),
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        content = os.path.join(directory, "content")
+        public = os.path.join(directory, "public")
+        write_site(content, pages, page_text)
+        sequential = None
+        for name, build in builds:
+            seconds = best_time(build, content, public)
+            sequential = sequential or seconds
+            print(f"{name:<40} {seconds * 1000:10.2f} ms {pages / seconds:10.0f} pages/s"
+                  f" {sequential / seconds:6.2f}x")
+
+
+# -----------------------------------------------------------------------
+# Document cache
+# -----------------------------------------------------------------------
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+def write_distinct_site(content, pages, page_text):
+    # Like write_site, but no two pages share a block, so neither cache can
+    # reuse one page's work for another
+    for index in range(pages):
+        path = os.path.join(content, f"section{index % 50}", f"page{index}.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(page_text.replace("a ", f"a{index} "))
+
+
+def timed_build(*args):
+    # Seconds for a forced, single process build in a new interpreter,
+    # startup included
+    start = time.perf_counter()
+    subprocess.run([sys.executable, MAIN, "build", "--jobs", "1", "--force", *args],
+                   check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def bench_document_cache(size, pages=10_000):
+    page_text = make_document(max(1, size // pages))
+    with tempfile.TemporaryDirectory() as directory:
+        content = os.path.join(directory, "content")
+        public = ["--content", content, "--public", os.path.join(directory, "public")]
+        documents = os.path.join(directory, "documents.bin")
+        blocks = os.path.join(directory, "blocks")
+        write_distinct_site(content, pages, page_text)
+
+        timed_build(*public)  # warm the page cache of the OS
+        runs = (
+            ("no cache", ()),
+            ("document cache, cold", ("--document-cache", documents)),
+            ("document cache, warm", ("--document-cache", documents)),
+            ("block cache directory, cold", ("--block-cache", blocks)),
+            ("block cache directory, warm", ("--block-cache", blocks)),
+        )
+        for name, args in runs:
+            seconds = timed_build(*public, *args)
+            print(f"{name:<40} {seconds * 1000:10.2f} ms {pages / seconds:10.0f} pages/s")
+        print(f"document cache file: {os.path.getsize(documents) / 1_000_000:.2f} MB")
+
+
+# -----------------------------------------------------------------------
+# Scaling across cores
+# -----------------------------------------------------------------------
+
+def bench_scaling(size, pages=50_000):
+    # Forced builds of a `pages` page site with 1 to os.cpu_count() jobs
+    # (and at least 2, so the process pool is measured too), and what a
+    # batch of 16 pages sends back from a worker
+    page_text = make_document(max(1, size // pages))
+    cores = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        content = os.path.join(directory, "content")
+        public = os.path.join(directory, "public")
+        write_distinct_site(content, pages, page_text)
+
+        batch = [(source, output_path(source, content, public)) for source in
+                 sorted(os.path.join(content, "section0", name) for name in os.listdir(os.path.join(content, "section0")))[:16]]
+        html_results = len(pickle.dumps(render_sources(read_sources(batch))))
+        metadata_results = len(pickle.dumps(render_batch(batch)))
+        print(f"returned per page: {html_results / len(batch):.0f} bytes with the HTML, "
+              f"{metadata_results / len(batch):.0f} bytes of page metadata")
+
+        for name, build in (("build_site", build_site), ("async_build_site", async_build_site)):
+            single = None
+            for jobs in range(1, max(2, cores) + 1):
+                seconds = best_time(lambda: build(content, public, jobs=jobs, force=True), repeat=1)
+                single = single or seconds
+                print(f"{name + f', jobs={jobs}':<40} {seconds * 1000:10.2f} ms {pages / seconds:10.0f} pages/s"
+                      f" {single / seconds:6.2f}x")
+    print(f"({cores} CPUs)")
+
+
+# -----------------------------------------------------------------------
+# Regression suite
+#
+# `run` times every hot path on synthetic corpora and writes the results to
+# a JSON file; `compare` fails when a case got slower than its baseline by
+# more than the threshold.
+# -----------------------------------------------------------------------
+
+def make_link_text(size):
+    chunk = "see [the docs](https://boot.dev/docs) or [the blog](https://blog.boot.dev) "
+    return chunk * (size // len(chunk) + 1)
+
+
+def make_small_pages(size):
+    page = "# Title\n\nA short page with **bold** and a [link](https://boot.dev).\n\n- one\n- two\n"
+    return [page] * max(1, size // len(page))
+
+
+def classify_blocks(blocks):
+    for block in blocks:
+        block_to_block_type(block)
+
+
+def convert_text_nodes(nodes):
+    for node in nodes:
+        text_node_to_html_node(node)
+
+
+def render_pages(pages):
+    for page in pages:
+        markdown_to_html_node(page).to_html()
+
+
+def render_pages_fused(pages):
+    for page in pages:
+        markdown_to_html(page)
+
+
+# name -> (builds the arguments for a corpus size, function to time)
+SUITE = {
+    "markdown_to_blocks/long_document": (
+        lambda size: (make_document(size),), markdown_to_blocks),
+    "block_to_block_type/mixed_blocks": (
+        lambda size: (markdown_to_blocks(make_document(size)),), classify_blocks),
+    "text_to_textnodes/long_paragraph": (
+        lambda size: (make_paragraph(size),), text_to_textnodes),
+    "text_to_textnodes/dense_links": (
+        lambda size: (make_link_text(size),), text_to_textnodes),
+    "text_to_textnodes/unmatched_delimiters": (
+        lambda size: (ADVERSARIAL_TEXTS["discarded openers"](size),), text_to_textnodes),
+    "text_to_textnodes/nested_emphasis": (
+        lambda size: (ADVERSARIAL_TEXTS["nested emphasis"](size),), text_to_textnodes),
+    "text_to_textnodes/unclosed_brackets": (
+        lambda size: (ADVERSARIAL_TEXTS["unclosed brackets"](size),), text_to_textnodes),
+    "text_node_to_html_node/long_paragraph": (
+        lambda size: (text_to_textnodes(make_paragraph(size)),), convert_text_nodes),
+    "text_nodes_to_html/long_paragraph": (
+        lambda size: (text_to_textnodes(make_paragraph(size)),), text_nodes_to_html),
+    "to_html/page_tree": (
+        lambda size: (make_page_tree(size),), lambda node: node.to_html()),
+    "to_html/navigation_links": (
+        lambda size: (make_nav_tree(size),), lambda node: node.to_html()),
+    "to_html/deep_nesting": (
+        lambda size: (make_deep_tree(max(1, size // 100)),), lambda node: node.to_html()),
+    "markdown_to_html_node/many_small_pages": (
+        lambda size: (make_small_pages(size),), render_pages),
+    "markdown_to_html/many_small_pages": (
+        lambda size: (make_small_pages(size),), render_pages_fused),
+    "markdown_to_html/long_document": (
+        lambda size: (make_document(size),), markdown_to_html),
+}
+
+
+def run_suite(size, repeat=5, names=None):
+    results = {}
+    for name in names or SUITE:
+        setup, func = SUITE[name]
+        args = setup(size)
+        results[name] = best_time(func, *args, repeat=repeat)
+    return {
+        "python": platform.python_version(),
+        "size": size,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare_results(baseline, current, threshold):
+    # Cases that got slower than baseline * (1 + threshold), as
+    # (name, baseline seconds, current seconds)
+    regressions = []
+    for name, before in baseline["results"].items():
+        after = current["results"].get(name)
+        if after is not None and after > before * (1 + threshold):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def print_comparison(baseline, current):
+    print(f"{'case':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, before in baseline["results"].items():
+        after = current["results"].get(name)
+        if after is None:
+            print(f"{name:<40} {before * 1000:9.2f} ms {'missing':>12}")
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{name:<40} {before * 1000:9.2f} ms {after * 1000:9.2f} ms {change:+7.1f}%")
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+BENCHMARKS = {
+    "inline": bench_text_to_textnodes,
+    "views": bench_text_node_views,
+    "batch": bench_batches,
+    "adversarial": bench_adversarial_delimiters,
+    "links": bench_split_nodes_link,
+    "convert": bench_text_node_conversion,
+    "write_html": bench_write_html,
+    "render_depth": bench_render_depth,
+    "node_memory": bench_node_memory,
+    "blocks": bench_markdown_to_blocks,
+    "block_type": bench_block_to_block_type,
+    "block_types": bench_block_types,
+    "fused": bench_markdown_to_html,
+    "props": bench_props_to_html,
+    "escape": bench_escaping,
+    "template": bench_templates,
+    "watch": bench_watch_rebuild,
+    "pipeline": bench_build_pipeline,
+    "document_cache": bench_document_cache,
+    "scaling": bench_scaling,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the static site generator")
+    subcommands = parser.add_subparsers(dest="command")
+
+    report_parser = subcommands.add_parser("report", help="compare current code against the old implementations")
+    report_parser.add_argument("names", nargs="*",
+                               help=f"benchmarks to run, any of {', '.join(BENCHMARKS)} (default: all)")
+    report_parser.add_argument("--size", type=int, default=1_000_000, help="input size in characters")
+
+    run_parser = subcommands.add_parser("run", help="time the regression suite and save the results")
+    run_parser.add_argument("--output", "-o", default="bench_results.json", help="JSON file to write")
+    run_parser.add_argument("--size", type=int, default=200_000, help="corpus size in characters")
+    run_parser.add_argument("--repeat", type=int, default=5, help="runs per case, the best one is kept")
+
+    compare_parser = subcommands.add_parser("compare", help="fail if results regressed against a baseline")
+    compare_parser.add_argument("baseline", help="JSON file from an earlier run")
+    compare_parser.add_argument("current", help="JSON file from the run to check")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="allowed slowdown, 0.10 means 10%% (default)")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(["report"])
+
+    if args.command == "report":
+        for name in args.names:
+            if name not in BENCHMARKS:
+                parser.error(f"unknown benchmark: {name}")
+        for name in args.names or BENCHMARKS:
+            print(f"== {name}")
+            BENCHMARKS[name](args.size)
+
+    elif args.command == "run":
+        results = run_suite(args.size, args.repeat)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        for name, seconds in results["results"].items():
+            print(f"{name:<40} {seconds * 1000:10.2f} ms")
+        print(f"Results written to {args.output}")
+
+    elif args.command == "compare":
+        baseline = load_results(args.baseline)
+        current = load_results(args.current)
+        if baseline.get("size") != current.get("size"):
+            print(f"warning: corpus sizes differ ({baseline.get('size')} vs {current.get('size')})")
+        print_comparison(baseline, current)
+        regressions = compare_results(baseline, current, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+from htmlnode import LeafNode
+from markdown_blocks import block_to_html, custom_block_types, element, markdown_to_blocks
+
+# -------------------------------------------------------------------------
+# Memoizing the block pipeline
+#
+# Most edits touch a single paragraph, so the HTML of every block is cached
+# under a hash of the block's text. An unchanged block skips
+# block_to_block_type, inline parsing and the HTMLNode tree entirely.
+# -------------------------------------------------------------------------
+
+# Bump when the HTML produced for the same block text changes, so older
+# on-disk entries are not reused
+CACHE_VERSION = 3
+
+
+def parser_version():
+    # Registering a block type can change how a block renders, so the
+    # registered types are part of the version
+    return "\0".join((str(CACHE_VERSION),) + custom_block_types())
+
+
+def block_key(block):
+    return hashlib.sha256(f"{parser_version()}\0{block}".encode("utf-8")).hexdigest()
+
+
+class BlockCache:
+    def __init__(self, max_entries: int = 10_000, directory: str = None):
+        # max_entries bounds the in-memory LRU, directory (optional) keeps
+        # fragments on disk between runs and across worker processes
+        if max_entries < 1:
+            raise ValueError("BlockCache needs room for at least one entry")
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key[:2], key + ".html")
+
+    def get(self, block):
+        key = block_key(block)
+        html = self.entries.get(key)
+        if html is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+        if self.directory:
+            try:
+                with open(self.path_for(key), encoding="utf-8") as f:
+                    html = f.read()
+            except OSError:
+                html = None
+            if html is not None:
+                self.remember(key, html)
+                self.hits += 1
+                return html
+
+        self.misses += 1
+        return None
+
+    def put(self, block, html):
+        key = block_key(block)
+        self.remember(key, html)
+        if self.directory:
+            path = self.path_for(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Several workers can write the same block, os.replace keeps
+            # every reader on a complete file
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(temporary, path)
+
+    def remember(self, key, html):
+        self.entries[key] = html
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def render_block(self, block):
+        html = self.get(block)
+        if html is None:
+            html = block_to_html(block)
+            self.put(block, html)
+        return html
+
+    def markdown_to_html_node(self, markdown):
+        # Renders like markdown_blocks.markdown_to_html_node, but each block
+        # is an already rendered fragment held in a raw text LeafNode
+        blocks = markdown_to_blocks(markdown)
+        children = [LeafNode(None, self.render_block(block), raw=True) for block in blocks]
+        return element("div", children)
+
+    def markdown_to_html(self, markdown):
+        # Same as markdown_to_html_node(markdown).to_html()
+        parts = [self.render_block(block) for block in markdown_to_blocks(markdown)]
+        return f"<div>{''.join(parts)}</div>"
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"BlockCache(entries={len(self.entries)}, hits={self.hits}, misses={self.misses})"
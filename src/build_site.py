@@ -0,0 +1,435 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+import profiling
+
+from block_cache import BlockCache
+from document_cache import DocumentCache, document_key
+from htmlnode import escape_html
+from markdown_blocks import extract_title
+from template import load_template
+
+# -------------------------------------------------------------------------
+# Building the whole site: every content/**/*.md becomes public/**/*.html
+# -------------------------------------------------------------------------
+
+# The manifest lives in public/ and remembers, for every source file, the
+# hash of the markdown and of the HTML written for it, and the hash of the
+# page template the site was built with. Bump the version when the rendered
+# output of an unchanged source can change.
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 3
+
+
+class BuildResult:
+    def __init__(self, pages: list, seconds: float, skipped: list = None, removed: list = None,
+                 block_hits: int = 0, block_misses: int = 0, profile=None, document_hits: int = 0,
+                 errors: list = None):
+        self.pages = pages
+        self.seconds = seconds
+        self.skipped = skipped or []
+        self.removed = removed or []
+        self.block_hits = block_hits
+        self.block_misses = block_misses
+        self.profile = profile
+        self.document_hits = document_hits
+        # (source, message) for every page that could not be rendered
+        self.errors = errors or []
+
+    def pages_per_second(self):
+        if not self.seconds:
+            return float("inf")
+        return len(self.pages) / self.seconds
+
+    def __repr__(self):
+        return (f"BuildResult(pages={len(self.pages)}, skipped={len(self.skipped)}, "
+                f"removed={len(self.removed)}, errors={len(self.errors)}, seconds={self.seconds:.3f})")
+
+
+def output_path(source, content_dir, public_dir):
+    relative = os.path.relpath(source, content_dir)
+    return os.path.join(public_dir, relative[:-len(".md")] + ".html")
+
+
+def find_pages(content_dir, public_dir):
+    # (source, destination) for every markdown file, sorted for stable output
+    pages = []
+    for dirpath, dirnames, filenames in os.walk(content_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if not filename.endswith(".md"):
+                continue
+            source = os.path.join(dirpath, filename)
+            pages.append((source, output_path(source, content_dir, public_dir)))
+    return pages
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def template_hash(template_path):
+    # None without a template, so manifests of untemplated builds stay valid
+    if template_path is None:
+        return None
+    with open(template_path, "rb") as f:
+        return content_hash(f.read())
+
+
+def template_values(markdown, content):
+    # What the slots of a page template are filled with: content is the
+    # page's HTML, as a string or an HTMLNode
+    return {"title": escape_html(extract_title(markdown)), "content": content}
+
+
+@contextmanager
+def write_output(destination):
+    # Opens a page for writing. The page goes to a temporary file next to
+    # destination that replaces it once everything is written: a page that
+    # fails halfway leaves its previous output untouched, and the dev
+    # server never serves a truncated one.
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    temporary = f"{destination}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "w", encoding="utf-8") as f:
+            yield f
+        os.replace(temporary, destination)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+class HashingWriter:
+    # Writes text to a file and hashes it on the way, so the output hash
+    # costs no second read of the file
+    def __init__(self, file):
+        self.file = file
+        self.hash = hashlib.sha256()
+
+    def write(self, text):
+        self.hash.update(text.encode("utf-8"))
+        return self.file.write(text)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+# Every process (this one, or each pool worker) keeps its own in-memory
+# block cache for as long as it lives; block_cache_dir is shared by all.
+_block_cache = None
+
+def get_block_cache(block_cache_dir=None):
+    global _block_cache
+    if _block_cache is None or _block_cache.directory != block_cache_dir:
+        _block_cache = BlockCache(directory=block_cache_dir)
+    return _block_cache
+
+
+# And the document cache, mapped once per process and mapped again when
+# another process saved a new one
+_document_cache = None
+
+def get_document_cache(document_cache_path=None):
+    global _document_cache
+    if document_cache_path is None:
+        return None
+    if _document_cache is None or _document_cache.path != document_cache_path \
+            or not _document_cache.is_current():
+        _document_cache = DocumentCache(document_cache_path)
+    return _document_cache
+
+
+def render_body(text, source_hash, cache, documents):
+    # The page's HTML before the template: an HTMLNode of block fragments
+    # without a document cache, otherwise a string, taken from the document
+    # cache or rendered. Returns (body, newly rendered HTML for the document
+    # cache or None)
+    if documents is None:
+        return cache.markdown_to_html_node(text), None
+    html = documents.get(document_key(source_hash))
+    if html is not None:
+        return html, None
+    html = cache.markdown_to_html(text)
+    return html, html
+
+
+def update_document_cache(document_cache_path, manifest, rendered):
+    # Adds the newly rendered pages and drops pages no longer in the site
+    documents = get_document_cache(document_cache_path)
+    for page in rendered:
+        if page["document"] is not None:
+            documents.put(document_key(page["source_hash"]), page["document"])
+    documents.save({document_key(entry["source_hash"]) for entry in manifest.values()})
+
+
+# Same for the profiler: profile is None, or (trace, memory) to record
+# every stage of every page this process renders
+_profiler = None
+
+def get_profiler(profile=None):
+    global _profiler
+    if profile is None:
+        return None
+    trace, memory = profile
+    if _profiler is None or (_profiler.trace, _profiler.memory) != (trace, memory) \
+            or not profiling.is_instrumented():
+        _profiler = profiling.Profiler(trace=trace, memory=memory)
+        profiling.instrument(_profiler)
+    return _profiler
+
+
+def render_page(source, destination, block_cache_dir=None, profile=None, template_path=None,
+                document_cache_path=None):
+    start = time.perf_counter()
+    profiler = get_profiler(profile)
+    stage = profiler.stage if profiler else no_stage
+
+    with stage("page", source):
+        with stage("read"):
+            with open(source, "rb") as f:
+                data = f.read()
+
+        cache = get_block_cache(block_cache_dir)
+        documents = get_document_cache(document_cache_path)
+        hits, misses = cache.hits, cache.misses
+        document_hits = documents.hits if documents else 0
+        text = data.decode("utf-8")
+        source_hash = content_hash(data)
+        body, document = render_body(text, source_hash, cache, documents)
+        if template_path is not None:
+            with stage("template"):
+                template = load_template(template_path)
+                values = template_values(text, body)
+
+        # The tree is only validated while it is written, see write_output
+        with write_output(destination) as f:
+            writer = HashingWriter(f)
+            if profiler:
+                # write_html produces the chunks, writer.write hashes and writes them
+                writer.write = profiler.wrap("write", writer.write)
+            with stage("serialize"):
+                if template_path is not None:
+                    template.write(writer, values)
+                elif isinstance(body, str):
+                    writer.write(body)
+                else:
+                    body.write_html(writer)
+
+    page = {
+        "source": source,
+        "output": destination,
+        "source_hash": source_hash,
+        "output_hash": writer.hexdigest(),
+        "block_hits": cache.hits - hits,
+        "block_misses": cache.misses - misses,
+        "document": document,
+        "document_hit": documents is not None and documents.hits > document_hits,
+        "seconds": time.perf_counter() - start,
+    }
+    if profiler:
+        page["profile"] = profiler.take()
+    return page
+
+
+def no_stage(name, detail=None):
+    return nullcontext()
+
+
+# What a page can fail with: unreadable or undecodable source, a template
+# slot without a value, a custom block renderer rejecting its block
+PAGE_ERRORS = (OSError, ValueError)
+
+def failed_page(source, destination, error):
+    # Stands in for the page dict of a page that could not be rendered
+    return {"source": source, "output": destination, "error": f"{type(error).__name__}: {error}"}
+
+
+def try_render_page(source, destination, *args):
+    # render_page, or failed_page when it fails, so one broken page does
+    # not stop the build
+    try:
+        return render_page(source, destination, *args)
+    except PAGE_ERRORS as error:
+        if _profiler is not None:
+            # Drop the stages the failed page recorded
+            _profiler.take()
+        return failed_page(source, destination, error)
+
+
+def render_page_args(page):
+    return try_render_page(*page)
+
+# -------------------------------------------------------------------------
+# Manifest
+# -------------------------------------------------------------------------
+
+def load_manifest(public_dir, template_hash=None):
+    # A missing, unreadable or outdated manifest, or one written with
+    # another template, means everything is rebuilt
+    path = os.path.join(public_dir, MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    if manifest.get("template") != template_hash:
+        return {}
+    return manifest.get("pages", {})
+
+
+def save_manifest(public_dir, pages, template_hash=None):
+    os.makedirs(public_dir, exist_ok=True)
+    path = os.path.join(public_dir, MANIFEST_NAME)
+    # Write to a temporary file first so an interrupted build can't leave a
+    # half written manifest behind
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        manifest = {"version": MANIFEST_VERSION, "pages": pages}
+        if template_hash is not None:
+            manifest["template"] = template_hash
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def manifest_entry(page, stat, public_dir):
+    # What the manifest keeps for a page returned by render_page
+    return {
+        "output": os.path.relpath(page["output"], public_dir),
+        "source_hash": page["source_hash"],
+        "output_hash": page["output_hash"],
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def is_unchanged(entry, source, destination, stat):
+    if entry is None or not os.path.exists(destination):
+        return False
+    if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return True
+    # The file was touched, only its content decides
+    with open(source, "rb") as f:
+        return content_hash(f.read()) == entry["source_hash"]
+
+
+def plan_build(content_dir, public_dir, force=False, template_hash=None):
+    # Works out what a build has to do. Returns the old manifest, the new
+    # manifest holding the unchanged pages, the destinations skipped, and
+    # the (source, destination) pages to render with the stat of each source.
+    # A missing content directory is an error, not an empty site: that would
+    # remove every page built before.
+    if not os.path.isdir(content_dir):
+        raise FileNotFoundError(f"Content directory {content_dir!r} does not exist")
+    old_manifest = load_manifest(public_dir, template_hash)
+    manifest = {}
+    skipped = []
+    to_render = []
+    stats = {}
+    for source, destination in find_pages(content_dir, public_dir):
+        key = os.path.relpath(source, content_dir)
+        stat = os.stat(source)
+        entry = old_manifest.get(key)
+        if not force and is_unchanged(entry, source, destination, stat):
+            entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+            manifest[key] = entry
+            skipped.append(destination)
+        else:
+            stats[source] = stat
+            to_render.append((source, destination))
+    return old_manifest, manifest, skipped, to_render, stats
+
+
+def finish_build(content_dir, public_dir, old_manifest, manifest, rendered, stats, template_hash=None,
+                 failed=()):
+    # Records the rendered pages, removes the outputs of sources that no
+    # longer exist and saves the manifest. Returns the removed outputs.
+    # A failed page keeps its old entry and output, if it had any: its
+    # source hash no longer matches, so the next build tries it again.
+    for page in rendered:
+        key = os.path.relpath(page["source"], content_dir)
+        manifest[key] = manifest_entry(page, stats[page["source"]], public_dir)
+    for page in failed:
+        key = os.path.relpath(page["source"], content_dir)
+        if key in old_manifest:
+            manifest[key] = old_manifest[key]
+
+    removed = []
+    for key, entry in old_manifest.items():
+        if key in manifest:
+            continue
+        output = os.path.join(public_dir, entry["output"])
+        if os.path.exists(output):
+            os.remove(output)
+        removed.append(output)
+
+    save_manifest(public_dir, manifest, template_hash)
+    return removed
+
+
+def split_failed(results):
+    # (rendered page dicts, failed page dicts)
+    rendered = [page for page in results if "error" not in page]
+    failed = [page for page in results if "error" in page]
+    return rendered, failed
+
+
+def build_site(content_dir="content", public_dir="public", jobs=None, force=False,
+               block_cache_dir=None, profile=False, trace=False, profile_memory=False,
+               template_path=None, document_cache_path=None):
+    # jobs=None uses one worker per CPU, jobs=1 builds in this process.
+    # force=True renders every page, even the ones the manifest says are
+    # unchanged. block_cache_dir keeps rendered blocks on disk between builds.
+    # profile=True times every stage of every page into result.profile,
+    # trace=True also keeps Chrome trace events, profile_memory=True also
+    # records allocated bytes. template_path wraps every page in a page
+    # template, see template.py. document_cache_path keeps the rendered
+    # pages in one file, see document_cache.py.
+    start = time.perf_counter()
+    page_template = template_hash(template_path)
+    old_manifest, manifest, skipped, pages, stats = plan_build(content_dir, public_dir, force, page_template)
+
+    page_profile = (trace, profile_memory) if profile or trace or profile_memory else None
+    to_render = [(source, destination, block_cache_dir, page_profile, template_path, document_cache_path)
+                 for source, destination in pages]
+
+    if jobs == 1 or len(to_render) <= 1:
+        try:
+            results = [try_render_page(*page) for page in to_render]
+        finally:
+            # Leave this process' functions the way they were
+            profiling.uninstrument()
+    else:
+        workers = jobs or os.cpu_count() or 1
+        # Hand pages out in batches so small pages don't pay one round trip each
+        chunksize = max(1, len(to_render) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render_page_args, to_render, chunksize=chunksize))
+
+    rendered, failed = split_failed(results)
+    removed = finish_build(content_dir, public_dir, old_manifest, manifest, rendered, stats, page_template,
+                           failed)
+    if document_cache_path is not None:
+        update_document_cache(document_cache_path, manifest, rendered)
+
+    build_profile = None
+    if page_profile:
+        build_profile = profiling.BuildProfile()
+        for page in rendered:
+            build_profile.add_page(page["source"], page["seconds"], page["profile"])
+
+    written = [page["output"] for page in rendered]
+    return BuildResult(
+        written, time.perf_counter() - start, skipped, removed,
+        block_hits=sum(page["block_hits"] for page in rendered),
+        block_misses=sum(page["block_misses"] for page in rendered),
+        profile=build_profile,
+        document_hits=sum(page["document_hit"] for page in rendered),
+        errors=[(page["source"], page["error"]) for page in failed],
+    )
@@ -0,0 +1,416 @@
+import ctypes
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from build_site import (
+    PAGE_ERRORS,
+    BuildResult,
+    build_site,
+    find_pages,
+    is_unchanged,
+    load_manifest,
+    manifest_entry,
+    output_path,
+    render_page,
+    save_manifest,
+    template_hash,
+    update_document_cache,
+)
+
+# -------------------------------------------------------------------------
+# Development server: serve public/, watch content/ and rebuild the pages
+# that change, then tell the browser to reload them
+# -------------------------------------------------------------------------
+
+# -------------------------------------------------------------------------
+# Watching the content directory
+#
+# Both watchers have the same interface: wait(timeout) returns the set of
+# paths (files or directories) that changed, or an empty set on timeout.
+# -------------------------------------------------------------------------
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    # Linux only: the kernel queues an event for every change as it happens
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, directory: str, settle: float = 0.005):
+        # settle: how long to keep collecting events once the first arrives,
+        # editors often save a file in several steps
+        self.directory = directory
+        self.settle = settle
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.fd = fd
+        self.directories = {}    # watch descriptor -> directory path
+        try:
+            self.watch_tree(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def watch(self, path):
+        wd = self._add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.directories[wd] = path
+
+    def watch_tree(self, directory):
+        for dirpath, dirnames, filenames in os.walk(directory):
+            self.watch(dirpath)
+
+    def read_events(self):
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, everything has to be looked at again
+                changed.add(self.directory)
+                continue
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # The directory itself is gone
+                del self.directories[wd]
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self.watch_tree(path)
+                    except OSError:
+                        pass    # already gone again
+                changed.add(path)
+            elif not mask & IN_CREATE:
+                # A new file is reported once it is written and closed
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        changed = self.read_events()
+        while select.select([self.fd], [], [], self.settle)[0]:
+            changed |= self.read_events()
+        return changed
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class PollingWatcher:
+    # Works everywhere, compares the size and mtime of every file each
+    # interval
+    def __init__(self, directory: str, interval: float = 0.1):
+        self.directory = directory
+        self.interval = interval
+        self.files = self.scan()
+
+    def scan(self):
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            files = self.scan()
+            changed = {path for path in files.keys() | self.files.keys()
+                       if files.get(path) != self.files.get(path)}
+            self.files = files
+            if changed:
+                return changed
+            if deadline is None:
+                time.sleep(self.interval)
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return changed
+                time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory, poll=False):
+    # inotify when the platform has it, polling otherwise (or when asked to)
+    if not poll:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory)
+
+# -------------------------------------------------------------------------
+# Rebuilding what changed
+# -------------------------------------------------------------------------
+
+class DevSite:
+    # Keeps the manifest in memory between rebuilds, it is only written
+    # back by save()
+    def __init__(self, content_dir: str, public_dir: str, block_cache_dir: str = None,
+                 template_path: str = None, document_cache_path: str = None):
+        self.content_dir = content_dir
+        self.public_dir = public_dir
+        self.block_cache_dir = block_cache_dir
+        self.template_path = template_path
+        self.document_cache_path = document_cache_path
+        self.rendered = []
+        self.template_hash = template_hash(template_path)
+        self.manifest = load_manifest(public_dir, self.template_hash)
+
+    def pages_below(self, path):
+        # Every page known or present under a directory, for events that
+        # only name the directory (created, moved, deleted, lost events)
+        relative = os.path.relpath(path, self.content_dir)
+        prefix = "" if relative == "." else relative + os.sep
+        sources = {os.path.join(self.content_dir, key) for key in self.manifest if key.startswith(prefix)}
+        if os.path.isdir(path):
+            sources.update(source for source, destination in find_pages(path, self.public_dir))
+        return sources
+
+    def rebuild(self, paths):
+        start = time.perf_counter()
+        sources = set()
+        for path in paths:
+            if path.endswith(".md") and not os.path.isdir(path):
+                sources.add(path)
+            else:
+                sources.update(self.pages_below(path))
+
+        written, skipped, removed = [], [], []
+        for source in sorted(sources):
+            key = os.path.relpath(source, self.content_dir)
+            destination = output_path(source, self.content_dir, self.public_dir)
+            try:
+                stat = os.stat(source)
+            except FileNotFoundError:
+                if self.manifest.pop(key, None) is not None and os.path.exists(destination):
+                    os.remove(destination)
+                    removed.append(destination)
+                continue
+
+            entry = self.manifest.get(key)
+            if is_unchanged(entry, source, destination, stat):
+                entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+                skipped.append(destination)
+                continue
+            try:
+                page = render_page(source, destination, self.block_cache_dir, template_path=self.template_path,
+                                   document_cache_path=self.document_cache_path)
+            except PAGE_ERRORS as error:
+                # Keep serving while the page is being edited
+                print(f"{source}: {error}", file=sys.stderr)
+                continue
+            self.manifest[key] = manifest_entry(page, stat, self.public_dir)
+            if page["document"] is not None:
+                self.rendered.append(page)
+            written.append(destination)
+
+        return BuildResult(written, time.perf_counter() - start, skipped, removed)
+
+    def url_paths(self, outputs):
+        paths = []
+        for output in outputs:
+            path = "/" + os.path.relpath(output, self.public_dir).replace(os.sep, "/")
+            paths.append(path)
+            if path.endswith("/index.html"):
+                paths.append(path[:-len("index.html")])
+        return paths
+
+    def save(self):
+        save_manifest(self.public_dir, self.manifest, self.template_hash)
+        if self.document_cache_path is not None:
+            update_document_cache(self.document_cache_path, self.manifest, self.rendered)
+        self.rendered = []
+
+# -------------------------------------------------------------------------
+# Serving public/ with live reload
+#
+# Every HTML page is served with a small script that listens to the
+# /__reload server-sent event stream and reloads when its own path is in an
+# event.
+# -------------------------------------------------------------------------
+
+RELOAD_PATH = "/__reload"
+RELOAD_SCRIPT = (
+    f'<script>new EventSource("{RELOAD_PATH}").onmessage = function (event) {{'
+    ' if (JSON.parse(event.data).indexOf(location.pathname) !== -1) location.reload(); };</script>'
+).encode("utf-8")
+
+
+class ReloadNotifier:
+    # Hands the URL paths of every rebuild to the open /__reload streams
+    def __init__(self, history: int = 100):
+        self.condition = threading.Condition()
+        self.version = 0
+        self.changes = deque(maxlen=history)    # (version, paths)
+        self.closed = False
+
+    def notify(self, paths):
+        with self.condition:
+            self.version += 1
+            self.changes.append((self.version, list(paths)))
+            self.condition.notify_all()
+
+    def wait(self, version, timeout=None):
+        # (latest version, paths changed since version), no paths on timeout
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version or self.closed, timeout)
+            paths = [path for changed_version, changed in self.changes
+                     if changed_version > version for path in changed]
+            return self.version, paths
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, notifier=None, log_requests=True, **kwargs):
+        # The base class handles the request from __init__
+        self.notifier = notifier
+        self.log_requests = log_requests
+        super().__init__(*args, **kwargs)
+
+    def log_request(self, code="-", size="-"):
+        if self.log_requests:
+            super().log_request(code, size)
+
+    def do_GET(self):
+        url_path = self.path.split("?", 1)[0].split("#", 1)[0]
+        if url_path == RELOAD_PATH and self.notifier is not None:
+            return self.send_reload_events()
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and url_path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            return super().do_GET()
+
+        with open(path, "rb") as f:
+            body = f.read() + RELOAD_SCRIPT
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_reload_events(self):
+        # Anything rebuilt from the moment the page connects is sent
+        version = self.notifier.version
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        while not self.notifier.closed:
+            version, paths = self.notifier.wait(version, timeout=15)
+            # A comment line keeps idle connections open
+            message = f"data: {json.dumps(paths)}\n\n" if paths else ": keep-alive\n\n"
+            try:
+                self.wfile.write(message.encode("utf-8"))
+                self.wfile.flush()
+            except OSError:
+                return    # the page went away
+
+
+def make_server(public_dir, notifier=None, host="127.0.0.1", port=8000, log_requests=True):
+    def handler(*args, **kwargs):
+        return DevRequestHandler(*args, directory=public_dir, notifier=notifier,
+                                 log_requests=log_requests, **kwargs)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def watch_and_rebuild(site, watcher, notifier):
+    while True:
+        result = site.rebuild(watcher.wait())
+        if result.pages or result.removed:
+            notifier.notify(site.url_paths(result.pages + result.removed))
+            print(f"Rebuilt {len(result.pages)} pages, removed {len(result.removed)} "
+                  f"in {result.seconds * 1000:.1f} ms")
+
+
+def serve(content_dir="content", public_dir="public", host="127.0.0.1", port=8000,
+          watch=False, poll=False, jobs=None, block_cache_dir=None, template_path=None,
+          document_cache_path=None):
+    # Builds once, then serves public_dir until interrupted. watch=True
+    # rebuilds pages as content_dir changes (poll=True skips inotify). Only
+    # content_dir is watched, restart to pick up a changed template_path.
+    result = build_site(content_dir, public_dir, jobs=jobs, block_cache_dir=block_cache_dir,
+                        template_path=template_path, document_cache_path=document_cache_path)
+    print(f"Built {len(result.pages)} pages in {result.seconds:.2f}s, {len(result.skipped)} unchanged")
+    for source, error in result.errors:
+        print(f"{source}: {error}", file=sys.stderr)
+
+    notifier = ReloadNotifier()
+    server = make_server(public_dir, notifier, host, port)
+    print(f"Serving {public_dir} at http://{host}:{server.server_address[1]}/")
+    if not watch:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    site = DevSite(content_dir, public_dir, block_cache_dir, template_path, document_cache_path)
+    watcher = make_watcher(content_dir, poll)
+    print(f"Watching {content_dir} ({'polling' if isinstance(watcher, PollingWatcher) else 'inotify'})")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        watch_and_rebuild(site, watcher, notifier)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        notifier.close()
+        server.shutdown()
+        server.server_close()
+        site.save()
@@ -0,0 +1,157 @@
+import hashlib
+import mmap
+import os
+import struct
+
+from block_cache import parser_version
+
+# -------------------------------------------------------------------------
+# Snapshot of parsed documents
+#
+# One binary file holding the rendered body (markdown_to_html) of every
+# page of a site, so a new process can skip parsing pages it has seen
+# before. The file is mapped with mmap and nothing is decoded when it is
+# opened: a lookup binary-searches the sorted index in the mapping and only
+# decodes the page it finds.
+#
+#   magic    8 bytes   MAGIC
+#   count    uint32
+#   index    count * (key 32 bytes, offset uint64, length uint32), sorted by key
+#   bodies   UTF-8 HTML, at the offsets given by the index
+#
+# Keys hash the page's source hash together with the parser version, so a
+# change to the parser, or a registered block type, misses every old entry.
+# -------------------------------------------------------------------------
+
+MAGIC = b"SSGDOC1\0"
+_COUNT = struct.Struct("<I")
+_ENTRY = struct.Struct("<32sQI")
+_HEADER_SIZE = len(MAGIC) + _COUNT.size
+
+
+def document_key(source_hash):
+    # source_hash is build_site.content_hash of the markdown file
+    return hashlib.sha256(f"{parser_version()}\0{source_hash}".encode("utf-8")).digest()
+
+
+class DocumentCache:
+    def __init__(self, path: str):
+        self.path = path
+        self.map = None
+        self.file_id = None
+        self.count = 0
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.open()
+
+    def open(self):
+        # A missing, empty or damaged file is an empty cache
+        self.close()
+        try:
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                self.file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return
+        if len(self.map) < _HEADER_SIZE or self.map[:len(MAGIC)] != MAGIC:
+            self.close()
+            return
+        count = _COUNT.unpack_from(self.map, len(MAGIC))[0]
+        if _HEADER_SIZE + count * _ENTRY.size > len(self.map):
+            self.close()
+            return
+        self.count = count
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.map = None
+        self.file_id = None
+        self.count = 0
+
+    def is_current(self):
+        # False once another process replaced the file
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return self.file_id is None
+        return self.file_id == (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def find(self, key):
+        # (offset, length) of the body stored under key, or None
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            position = _HEADER_SIZE + middle * _ENTRY.size
+            found = self.map[position:position + 32]
+            if found == key:
+                return _ENTRY.unpack_from(self.map, position)[1:]
+            if found < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def get(self, key):
+        html = self.pending.get(key)
+        if html is None and self.map is not None:
+            found = self.find(key)
+            if found is not None and found[0] + found[1] <= len(self.map):
+                offset, length = found
+                html = self.map[offset:offset + length].decode("utf-8")
+        if html is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return html
+
+    def put(self, key, html):
+        # Kept in memory until save()
+        self.pending[key] = html
+
+    def save(self, keep):
+        # Writes every entry whose key is in keep, new ones and the ones
+        # already in the file (copied without decoding), then maps the new
+        # file. Nothing is written when nothing would change.
+        bodies = {}
+        for index in range(self.count):
+            position = _HEADER_SIZE + index * _ENTRY.size
+            key, offset, length = _ENTRY.unpack_from(self.map, position)
+            if key in keep and key not in self.pending:
+                bodies[key] = self.map[offset:offset + length]
+        kept_from_file = len(bodies)
+        for key, html in self.pending.items():
+            if key in keep:
+                bodies[key] = html.encode("utf-8")
+        if len(bodies) == kept_from_file == self.count and self.map is not None:
+            self.pending = {}
+            return
+
+        keys = sorted(bodies)
+        index = []
+        offset = _HEADER_SIZE + len(keys) * _ENTRY.size
+        for key in keys:
+            index.append(_ENTRY.pack(key, offset, len(bodies[key])))
+            offset += len(bodies[key])
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(_COUNT.pack(len(keys)))
+            f.writelines(index)
+            f.writelines(bodies[key] for key in keys)
+        os.replace(temporary, self.path)
+        self.pending = {}
+        self.open()
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return (f"DocumentCache({self.path!r}, documents={self.count}, pending={len(self.pending)}, "
+                f"hits={self.hits}, misses={self.misses})")
@@ -1,4 +1,39 @@
+# Elements the generator emits, and their opening and closing tags built once
+KNOWN_TAGS = (
+    "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "code", "blockquote",
+    "ul", "ol", "li", "b", "i", "a", "img",
+)
+_OPEN_TAGS = {tag: f"<{tag}>" for tag in KNOWN_TAGS}
+_CLOSE_TAGS = {tag: f"</{tag}>" for tag in KNOWN_TAGS}
+
+VOID_TAGS = frozenset(("img", "br", "hr", "input", "meta", "link"))
+
+# Escaping text and attribute values: &, <, > and ". Four str.replace
+# calls beat a str.translate table here: replace returns its input untouched
+# when there is nothing to replace and copies in bulk otherwise, while
+# translate goes character by character as soon as one maps to several.
+def escape_html(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+# Rendered (and escaped) attribute strings, keyed by the content of the props mapping:
+# the same href or src comes back on every page. As the key is the content,
+# a props dict that is changed or replaced never finds a stale entry. Only
+# string values are cached (1, 1.0 and True are equal keys but render
+# differently), and the cache starts over once it is full.
+_PROPS_HTML = {}
+PROPS_CACHE_SIZE = 4096
+
+
+def render_props(props):
+    props_str = " ".join(f'{key}="{escape_html(str(value))}"' for key, value in props.items())
+    return f" {props_str}"
+
+
 class HTMLNode:
+    # No per-instance __dict__: a page is made of many small nodes
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag: str = None, value: str = None, children: list = None, props: dict = None):
         self.tag = tag
         self.value = value
@@ -8,47 +43,107 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError("Subclasses must implement to_html method")
 
+    def iter_html(self):
+        raise NotImplementedError("Subclasses must implement iter_html method")
+
+    # Stream the HTML into a file-like object (anything with a write method)
+    # chunk by chunk, so the whole page never has to be in memory at once.
+    def write_html(self, sink):
+        write = sink.write
+        for chunk in self.iter_html():
+            write(chunk)
+
     def props_to_html(self):
-        if not self.props:
+        props = self.props
+        if not props:
             return ""
-        props_str = " ".join(f'{key}="{value}"' for key, value in self.props.items())
-        return f" {props_str}"
+        key = tuple(props.items())
+        try:
+            html = _PROPS_HTML.get(key)
+        except TypeError:
+            return render_props(props)    # unhashable values
+        if html is None:
+            html = render_props(props)
+            if all(type(value) is str for value in props.values()):
+                if len(_PROPS_HTML) >= PROPS_CACHE_SIZE:
+                    _PROPS_HTML.clear()
+                _PROPS_HTML[key] = html
+        return html
     
     def __repr__(self):
         return f"HTMLNode(tag={self.tag}, value={self.value}, children={self.children}, props={self.props})"
     
 class LeafNode(HTMLNode):
-    def __init__(self, tag: str, value: str, props: dict = None):
+    __slots__ = ("raw",)
+
+    # The value is escaped when rendered, raw=True is for values that
+    # already are HTML (or text the caller escaped) and must go out as is
+    def __init__(self, tag: str, value: str, props: dict = None, raw: bool = False):
         super().__init__(tag=tag, value=value, children=None, props=props)
+        self.raw = raw
 
     def to_html(self):
         props_html = self.props_to_html()
         if self.value is None:
             raise ValueError("LeafNode must have a value")
-        elif not self.tag:
-            return self.value
-        elif self.tag in ["img", "br", "hr", "input", "meta", "link"]:
+        value = self.value if self.raw else escape_html(self.value)
+        if not self.tag:
+            return value
+        elif self.tag in VOID_TAGS:
             return f"<{self.tag}{props_html}/>"
         else:
-            return f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
+            return f"<{self.tag}{props_html}>{value}</{self.tag}>"
+
+    def iter_html(self):
+        yield self.to_html()
     
     def __repr__(self):
         return f"LeafNode(tag={self.tag}, value={self.value}, props={self.props})"
     
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, children: list, props: dict = None):
         super().__init__(tag=tag, value=None, children=children, props=props)
 
-    def to_html(self):
+    def _validate(self):
         if not self.tag:
             raise ValueError("ParentNode must have a tag")
         if not self.children:
             raise ValueError("ParentNode must have children")
-        
-        opening_tag = f"<{self.tag}{self.props_to_html()}>"
-        children_html = "".join(child.to_html() for child in self.children)
-        closing_tag = f"</{self.tag}>"
-        return f"{opening_tag}{children_html}{closing_tag}"
+
+    def to_html(self):
+        return "".join(self.iter_html())
+
+    def open_tag(self):
+        if self.props:
+            return f"<{self.tag}{self.props_to_html()}>"
+        return _OPEN_TAGS.get(self.tag) or f"<{self.tag}>"
+
+    # Yields the opening tag, every child's chunks and the closing tag.
+    # Nested ParentNodes are walked with an explicit stack instead of
+    # recursion, so there is no depth limit and no string is built per level.
+    def iter_html(self):
+        self._validate()
+        yield self.open_tag()
+        stack = [(self.tag, iter(self.children))]
+        close_tags = _CLOSE_TAGS
+
+        while stack:
+            tag, children = stack[-1]
+            for child in children:
+                if isinstance(child, LeafNode):
+                    yield child.to_html()
+                elif isinstance(child, ParentNode):
+                    child._validate()
+                    yield child.open_tag()
+                    stack.append((child.tag, iter(child.children)))
+                    break
+                else:
+                    yield from child.iter_html()
+            else:
+                stack.pop()
+                yield close_tags.get(tag) or f"</{tag}>"
 
     def __repr__(self):
         return f"ParentNode(tag={self.tag}, children={self.children}, props={self.props})"
@@ -1,4 +1,5 @@
-from textnode import TextType, TextNode
+from batching import map_chunks
+from textnode import TextType, TextNode, TextNodeView, text_piece, text_span
 import re
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
@@ -14,32 +15,51 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return new_nodes
 
 def split_node_by_delimiter(node, delimiter, text_type):
-    text = node.text
+    if not isinstance(node, TextNodeView):
+        return split_text_by_delimiter(node.text, delimiter, text_type)
+    # Same pieces as node.text.split(delimiter), long ones as views into
+    # the view's source instead of copies
+    source, start, end = text_span(node)
     new_nodes = []
 
-    count = text.count(delimiter)
-    if count % 2 != 0:
-        raise ValueError("Unmatched delimiter in text")
+    bounds = [start]
+    index = source.find(delimiter, start, end)
+    while index != -1:
+        bounds.append(index)
+        bounds.append(index + len(delimiter))
+        index = source.find(delimiter, index + len(delimiter), end)
+    bounds.append(end)
+
+    # An odd number of delimiters leaves the last one without a closing
+    # partner, it stays in the text as it is
+    if len(bounds) % 4 == 0:
+        del bounds[-3:-1]
+
+    for i in range(0, len(bounds), 2):
+        part_start, part_end = bounds[i], bounds[i + 1]
+        if part_start == part_end:
+            continue  # skip empty pieces
+
+        node_type = TextType.TEXT if i % 4 == 0 else text_type
+        new_nodes.append(text_piece(source, part_start, part_end, node_type))
 
+    return new_nodes
+
+def split_text_by_delimiter(text, delimiter, text_type):
+    # split_node_by_delimiter for a plain TextNode: str.split copies the
+    # pieces faster than a find loop can work out their bounds
     parts = text.split(delimiter)
+    # An odd number of delimiters leaves the last one without a closing
+    # partner, it stays in the text as it is
+    if len(parts) % 2 == 0:
+        parts[-2:] = [parts[-2] + delimiter + parts[-1]]
 
+    new_nodes = []
     for i, part in enumerate(parts):
         if part == "":
             continue  # skip empty pieces
-
-    # for i, part in enumerate(parts):
         node_type = TextType.TEXT if i % 2 == 0 else text_type
         new_nodes.append(TextNode(part, node_type))
-
-        # if i % 2 == 0:
-        #     # outside delimiters
-        #     node_type = TextType.TEXT
-        # else:
-        #     # inside delimiters
-        #     node_type = text_type
-
-        # new_nodes.append(TextNode(part, node_type))
-
     return new_nodes
 
 # Regex patterns for inline elements
@@ -50,10 +70,11 @@ def split_node_by_delimiter(node, delimiter, text_type):
 # # [("rick roll", "https://i.imgur.com/aKaOqIh.gif"), ("obi wan", "https://i.imgur.com/fJRm4Vk.jpeg")]
 # -----------------------------------------------------------------------
 
+_IMAGE_RE = re.compile(r"!\[(.*?)\]\((.*?)\)")
+_LINK_RE = re.compile(r"(?<!\!)\[(.*?)\]\((.*?)\)")
+
 def extract_markdown_images(text):
-    pattern = r"!\[(.*?)\]\((.*?)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return _IMAGE_RE.findall(text)
 
 # -----------------------------------------------------------------------
 # text = "This is text with a link [to boot dev](https://www.boot.dev) and [to youtube](https://www.youtube.com/@bootdotdev)"
@@ -62,58 +83,81 @@ def extract_markdown_images(text):
 # -----------------------------------------------------------------------
 
 def extract_markdown_links(text):
-    pattern = r"(?<!\!)\[(.*?)\]\((.*?)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return _LINK_RE.findall(text)
+
+# Like extract_markdown_images / extract_markdown_links, but yields the
+# match objects, so callers get each element's span along with its groups
+def iter_markdown_images(text):
+    return _IMAGE_RE.finditer(text)
+
+def iter_markdown_links(text):
+    return _LINK_RE.finditer(text)
 
 # -----------------------------------------------------------------------
 
-def split_nodes_image(old_nodes):
+# Splits every TEXT node around the matches of pattern. The match spans
+# are used directly, so the text is scanned once and a link or image that
+# appears more than once is split at every occurrence. The pieces of a
+# view are views into its source when they are long, the pieces of a plain
+# TextNode are sliced out of its text.
+def split_nodes_by_pattern(old_nodes, pattern, text_type):
     new_nodes = []
 
     for node in old_nodes:
         if node.text_type != TextType.TEXT:
             new_nodes.append(node)
             continue
+        if not isinstance(node, TextNodeView):
+            split_text_by_pattern(node, pattern, text_type, new_nodes)
+            continue
 
-        text = node.text
-        images = extract_markdown_images(text)
+        source, start, end = text_span(node)
+        if start > 0 and source[start - 1] == "!":
+            # The link pattern looks at the character before a match, which
+            # is not part of this node's text
+            source, start, end = node.text, 0, end - start
+        current_index = start
 
-        # If there are no images, keep the node as is
-        if not images:
-            new_nodes.append(node)
-            continue
+        for match in pattern.finditer(source, start, end):
+            match_start = match.start()
 
-        # Process each image found in the text
-        current_index = 0
+            # Text before the match
+            if current_index < match_start:
+                new_nodes.append(text_piece(source, current_index, match_start, TextType.TEXT))
 
-        for alt_text, url in images:
-            pattern = f"![{alt_text}]({url})"
+            label_start, label_end = match.span(1)
+            new_nodes.append(text_piece(source, label_start, label_end, text_type, match.group(2)))
+            current_index = match.end()
 
-            # Find this pattern in full text, starting after last match
-            image_start = text.find(pattern, current_index)
-            if image_start == -1:
-                continue
-            image_end = image_start + len(pattern)
+        # If there were no matches, keep the node as is
+        if current_index == start:
+            new_nodes.append(node)
+        # Leftover text after the last match
+        elif current_index < end:
+            new_nodes.append(text_piece(source, current_index, end, TextType.TEXT))
 
-            # Text before the image
-            if current_index < image_start:
-                before = text[current_index: image_start]
-                new_nodes.append(TextNode(before, TextType.TEXT))
+    return new_nodes
 
-            # The image node iteself
-            new_nodes.append(TextNode(alt_text, TextType.IMAGE, url))
+def split_text_by_pattern(node, pattern, text_type, new_nodes):
+    # split_nodes_by_pattern for a plain TextNode
+    text = node.text
+    current_index = 0
 
-            # Move index to after this image
-            current_index = image_end
-        
-        # Leftover text after last image
+    for match in pattern.finditer(text):
+        start = match.start()
+        if current_index < start:
+            new_nodes.append(TextNode(text[current_index:start], TextType.TEXT))
+        label, url = match.groups()
+        new_nodes.append(TextNode(label, text_type, url))
+        current_index = match.end()
 
-        if current_index < len(text):
-            after = text[current_index: len(text)]
-            new_nodes.append(TextNode(after, TextType.TEXT))
+    if current_index == 0:
+        new_nodes.append(node)
+    elif current_index < len(text):
+        new_nodes.append(TextNode(text[current_index:], TextType.TEXT))
 
-    return new_nodes
+def split_nodes_image(old_nodes):
+    return split_nodes_by_pattern(old_nodes, _IMAGE_RE, TextType.IMAGE)
 
 # ------------------------------------------------
 
@@ -219,68 +263,248 @@ def split_nodes_image(old_nodes):
 #     return new_nodes
 
 def split_nodes_link(old_nodes):
-    new_nodes = []
-
-    for node in old_nodes:
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
+    return split_nodes_by_pattern(old_nodes, _LINK_RE, TextType.LINK)
 
-        text = node.text
-        links = extract_markdown_links(text)
+# -------------------------------------------------
 
-        if not links:
-            new_nodes.append(node)
+# Single pass inline scanner.
+#
+# text_to_textnodes walks the text once, left to right. Whatever starts
+# first wins:
+#
+#  - "`" starts a code span that ends at the next "`", its content is kept
+#    as is,
+#  - images and links are taken whole, an image wins over a link that
+#    would overlap it,
+#  - "**" and "_" go through a delimiter stack (as in CommonMark): a
+#    delimiter closes the nearest open delimiter of the same kind, or opens
+#    a new one. Delimiters opened in between and never closed, and any
+#    delimiter still open at the end, are kept as literal text.
+#
+# Bold and italic can nest, a bold or italic node with anything but plain
+# text inside gets children. Long runs of text and code become views into
+# the paragraph instead of copies (see text_piece). Every delimiter is pushed and popped at most
+# once, and every "[" costs one lookup of cached positions (see _Brackets),
+# so the whole scan stays linear even when nothing matches.
+
+# "[" and "![" are only where a link or image may start: whether one does
+# is worked out by _Brackets, not by the regex
+_INLINE_TOKEN_RE = re.compile(r"\*\*|_|`|!\[|(?<!!)\[")
+
+_DELIMITER_TYPES = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+}
+
+# Roles of a "**" or "_" token once the stack is done with it
+_LITERAL = 0
+_OPENS = 1
+_CLOSES = 2
+
+
+class _Brackets:
+    # Matches "[label](url)" like \[(.*?)\]\((.*?)\) does: the label ends
+    # at the first "](" after the "[", the url at the first ")" after that,
+    # both on the same line. The positions of the next "](", ")" and
+    # newline are kept and only looked up again once the scan has moved
+    # past them, so trying every "[" of a paragraph that never closes them
+    # stays linear instead of searching to the end of the line each time.
+    __slots__ = ("text", "found")
+
+    def __init__(self, text):
+        self.text = text
+        # needle -> (searched from, position found or -1)
+        self.found = {"](": (0, -2), ")": (0, -2), "\n": (0, -2)}
+
+    def find(self, needle, start):
+        searched_from, position = self.found[needle]
+        if searched_from <= start and (position >= start or position == -1):
+            return position
+        position = self.text.find(needle, start)
+        self.found[needle] = (start, position)
+        return position
+
+    def match(self, start):
+        # (position of "](", position of ")") for the "[" at start, or None
+        close = self.find("](", start + 1)
+        if close == -1:
+            return None
+        paren = self.find(")", close + 2)
+        if paren == -1:
+            return None
+        newline = self.find("\n", start + 1)
+        if newline != -1 and newline < paren:
+            return None
+        return close, paren
+
+    def first_image_start(self, start, end):
+        # Position of the first image that starts inside text[start:end], or -1
+        index = self.text.find("![", start, end)
+        while index != -1:
+            if self.match(index + 1) is not None:
+                return index
+            index = self.text.find("![", index + 1, end)
+        return -1
+
+
+def _emphasis_node(children, text_type):
+    # Plain text inside stays a flat node, like before nesting existed
+    if len(children) == 1 and children[0].text_type is TextType.TEXT and children[0].children is None:
+        return text_piece(*text_span(children[0]), text_type)
+    return TextNode(None, text_type, children=children)
+
+
+def _emit_tokens(text, tokens, nodes, last):
+    # Appends the nodes of tokens whose delimiters all have their role to
+    # nodes. last is the start of the plain text not emitted yet, the new
+    # one is returned.
+    parents = []     # (node list, TextType) of every open bold or italic
+    for start, end, role, value in tokens:
+        if role == _LITERAL:
             continue
+        if last < start:
+            nodes.append(text_piece(text, last, start, TextType.TEXT))
+        last = end
+
+        if role is None:
+            if value is not None:
+                nodes.append(value)
+        elif role == _OPENS:
+            parents.append((nodes, _DELIMITER_TYPES[value]))
+            nodes = []
+        else:
+            children = nodes
+            nodes, text_type = parents.pop()
+            # An empty pair like "a****b" only splits the text around it
+            if children:
+                nodes.append(_emphasis_node(children, text_type))
+    return last
 
-        current_index = 0
-
-        for label, url in links:
-            pattern = f"[{label}]({url})"
-
-            link_start = text.find(pattern,current_index)
-            if link_start == -1:
-                continue
-            link_end = link_start + len(pattern)
-
-            #text before the link
-            if current_index < link_start:
-                before = text[current_index: link_start]
-                new_nodes.append(TextNode(before, TextType.TEXT))
-
-            # the link node
-            new_nodes.append(TextNode(label, TextType.LINK, url))
-
-            current_index = link_end
-
-        # leftover text after last link
-        if current_index < len(text):
-            after = text[current_index: len(text)]
-            new_nodes.append(TextNode(after, TextType.TEXT))
-
-    return new_nodes
-
-# -------------------------------------------------
 
 def text_to_textnodes(text):
+    nodes = []
+    last = 0         # start of the plain text that is not emitted yet
+    # [start, end, role or None, delimiter or TextNode] for every token
+    # since the oldest "**" or "_" still open: which of them pair up is
+    # only known once they are all closed, or at the end. Code spans,
+    # images, links and pairs found while nothing is open go straight to
+    # nodes.
+    tokens = []
+    openers = []                          # indexes of the open delimiters
+    open_counts = {"**": 0, "_": 0}
+    brackets = _Brackets(text)
+    search = _INLINE_TOKEN_RE.search
+    pos = 0
+    match = None     # the next token when it was already found
+
+    while True:
+        if match is None:
+            match = search(text, pos)
+            if match is None:
+                break
+
+        start = match.start()
+        token = match.group()
+        match = None
+
+        if token == "**" or token == "_":
+            length = len(token)
+            if not open_counts[token]:
+                match = search(text, start + length)
+                if match is None or match.group() != token:
+                    openers.append(len(tokens))
+                    open_counts[token] += 1
+                    tokens.append([start, start + length, _LITERAL, token])
+                    pos = start + length
+                    continue
+                # Closed by the very next token, with plain text inside:
+                # the pair never goes on the stack
+                close = match.start()
+                match = None
+                node = text_piece(text, start + length, close, _DELIMITER_TYPES[token]) \
+                    if close > start + length else None
+                end = close + length
+            else:
+                # Close the nearest opener of this kind, anything opened
+                # after it stays literal
+                tokens.append([start, start + length, _CLOSES, token])
+                while True:
+                    opener = tokens[openers.pop()]
+                    open_counts[opener[3]] -= 1
+                    if opener[3] == token:
+                        break
+                opener[2] = _OPENS
+                pos = start + length
+                if not openers:
+                    last = _emit_tokens(text, tokens, nodes, last)
+                    tokens = []
+                continue
 
-    # 1. Start with a single TEXT node
-    nodes = [ TextNode(text, TextType.TEXT) ]
+        elif token == "`":
+            end = text.find("`", start + 1)
+            if end == -1:
+                # No closing backtick anywhere after this one, it is text
+                pos = start + 1
+                continue
+            node = text_piece(text, start + 1, end, TextType.CODE) if end > start + 1 else None
+            end += 1
 
-    # 2. Split by bold marker
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+        elif token == "![":
+            found = brackets.match(start + 1)
+            if found is None:
+                pos = start + 1
+                continue
+            close, paren = found
+            node = TextNode(text[start + 2:close], TextType.IMAGE, text[close + 2:paren])
+            end = paren + 1
 
-    # 3. Split by italic markers
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+        else:
+            found = brackets.match(start)
+            if found is None:
+                pos = start + 1
+                continue
+            close, paren = found
+            # A link is only kept if no image starts inside it, otherwise
+            # it has to end before that image
+            image_start = brackets.first_image_start(start + 1, paren + 1)
+            if image_start != -1:
+                close = text.find("](", start + 1, image_start)
+                paren = text.find(")", close + 2, image_start) if close != -1 else -1
+                if paren == -1:
+                    pos = start + 1
+                    continue
+            node = TextNode(text[start + 1:close], TextType.LINK, text[close + 2:paren])
+            end = paren + 1
+
+        # A code span, image, link or a pair closed right away (node is
+        # None when it is empty)
+        pos = end
+        if openers:
+            tokens.append([start, end, None, node])
+            continue
+        if last < start:
+            nodes.append(text_piece(text, last, start, TextType.TEXT))
+        if node is not None:
+            nodes.append(node)
+        last = end
+
+    if tokens:
+        # Delimiters still open at the end are literal text
+        last = _emit_tokens(text, tokens, nodes, last)
+    if last < len(text):
+        nodes.append(text_piece(text, last, len(text), TextType.TEXT))
 
-    # 4. Split by code marker
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    return nodes
 
-    # 5. Split out image nodes
-    nodes = split_nodes_image(nodes)
 
-    # 6. Split out link nodes
-    nodes = split_nodes_link(nodes)
+# -------------------------------------------------------------------------
+# Batches
+# -------------------------------------------------------------------------
 
-    # 7. Return final list of nodes
-    return nodes
+def text_to_textnodes_many(texts, executor=None, chunksize=1024):
+    # [text_to_textnodes(text) for text in texts] in one call. With an
+    # executor (a thread or process pool), chunks of chunksize texts are
+    # parsed in it.
+    if executor is not None:
+        return map_chunks(executor, text_to_textnodes_many, texts, chunksize)
+    return [text_to_textnodes(text) for text in texts]
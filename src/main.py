@@ -1,8 +1,116 @@
-from textnode import TextNode, TextType
+import argparse
+import os
+import sys
 
-def main():
-    # print("hello world")
-    TextNode_obj = TextNode("This is some anchor text", TextType.LINK, "https://www.boot.dev")
-    print(TextNode_obj)
+from async_build import async_build_site
+from build_site import build_site
+from dev_server import serve
 
-main()
\ No newline at end of file
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return number
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Static site generator")
+    subcommands = parser.add_subparsers(dest="command")
+
+    build = subcommands.add_parser("build", help="render content/ markdown into public/")
+    build.add_argument("--content", default="content", help="markdown source directory")
+    build.add_argument("--public", default="public", help="HTML output directory")
+    build.add_argument("--jobs", "-j", type=positive_int, default=None,
+                       help="worker processes (default: one per CPU)")
+    build.add_argument("--force", action="store_true",
+                       help="render every page, even if it has not changed")
+    build.add_argument("--block-cache", metavar="DIR", default=None,
+                       help="keep rendered blocks in DIR to reuse them in later builds")
+    build.add_argument("--profile", action="store_true",
+                       help="print the time spent in every stage and the slowest pages")
+    build.add_argument("--profile-memory", action="store_true",
+                       help="with --profile, also record allocated bytes per stage (slower)")
+    build.add_argument("--trace", metavar="FILE", default=None,
+                       help="write a Chrome trace-event JSON file of the build (implies --profile)")
+    build.add_argument("--document-cache", metavar="FILE", default=None,
+                       help="keep every rendered page in FILE, so later builds skip parsing unchanged pages")
+    build.add_argument("--template", metavar="FILE", default=None,
+                       help="wrap every page in FILE, filling its {{ title }} and {{ content }} slots")
+    build.add_argument("--asyncio", action="store_true",
+                       help="overlap reading, rendering and writing pages in an asyncio pipeline")
+    build.add_argument("--queue-size", type=positive_int, default=8,
+                       help="with --asyncio, batches of pages that may wait between two stages")
+    build.add_argument("--batch-size", type=positive_int, default=16,
+                       help="with --asyncio, pages handed from one stage to the next at once")
+
+    serve_parser = subcommands.add_parser("serve", help="build, then serve public/ over HTTP")
+    serve_parser.add_argument("--content", default="content", help="markdown source directory")
+    serve_parser.add_argument("--public", default="public", help="HTML output directory")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8000, help="port to listen on (0 picks a free one)")
+    serve_parser.add_argument("--watch", action="store_true",
+                              help="rebuild pages when content/ changes and reload them in the browser")
+    serve_parser.add_argument("--poll", action="store_true",
+                              help="with --watch, poll for changes instead of using inotify")
+    serve_parser.add_argument("--jobs", "-j", type=positive_int, default=None,
+                              help="worker processes for the first build (default: one per CPU)")
+    serve_parser.add_argument("--block-cache", metavar="DIR", default=None,
+                              help="keep rendered blocks in DIR to reuse them in later builds")
+    serve_parser.add_argument("--document-cache", metavar="FILE", default=None,
+                              help="keep every rendered page in FILE, so later builds skip parsing unchanged pages")
+    serve_parser.add_argument("--template", metavar="FILE", default=None,
+                              help="wrap every page in FILE, filling its {{ title }} and {{ content }} slots")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        # Running without a command builds with the defaults
+        args = parser.parse_args(["build"])
+    if args.command == "build" and args.asyncio and (args.profile or args.profile_memory or args.trace):
+        parser.error("--asyncio can not be combined with --profile, --profile-memory or --trace")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == "build":
+        if not os.path.isdir(args.content):
+            print(f"Content directory {args.content!r} does not exist", file=sys.stderr)
+            return 1
+        if args.asyncio:
+            result = async_build_site(args.content, args.public, jobs=args.jobs, force=args.force,
+                                      block_cache_dir=args.block_cache, queue_size=args.queue_size,
+                                      batch_size=args.batch_size, template_path=args.template,
+                                      document_cache_path=args.document_cache)
+        else:
+            result = build_site(args.content, args.public, jobs=args.jobs, force=args.force,
+                                block_cache_dir=args.block_cache, profile=args.profile,
+                                trace=args.trace is not None, profile_memory=args.profile_memory,
+                                template_path=args.template, document_cache_path=args.document_cache)
+        print(f"Built {len(result.pages)} pages in {result.seconds:.2f}s "
+              f"({result.pages_per_second():.1f} pages/s), "
+              f"{len(result.skipped)} unchanged, {len(result.removed)} removed")
+        print(f"Block cache: {result.block_hits} hits, {result.block_misses} misses")
+        if args.document_cache:
+            print(f"Document cache: {result.document_hits} hits")
+        for source, error in result.errors:
+            print(f"{source}: {error}", file=sys.stderr)
+        if result.profile:
+            print()
+            print(result.profile.report())
+            if args.trace:
+                result.profile.write_trace(args.trace)
+                print(f"Trace written to {args.trace}")
+        if result.errors:
+            print(f"Failed pages: {len(result.errors)}", file=sys.stderr)
+            return 1
+
+    elif args.command == "serve":
+        serve(args.content, args.public, host=args.host, port=args.port, watch=args.watch,
+              poll=args.poll, jobs=args.jobs, block_cache_dir=args.block_cache,
+              template_path=args.template, document_cache_path=args.document_cache)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,10 @@
 from enum import Enum
 
+from batching import map_chunks
+from htmlnode import LeafNode, ParentNode, escape_html
+from inline_markdown import text_to_textnodes
+from textnode import text_node_to_html_node, text_nodes_to_html
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -19,77 +24,287 @@ def markdown_to_blocks(markdown):
 
     return filtered_blocks
 
-def block_to_block_type(block):
-    # Check for heading (1-6 # characters, followed by space)
-    heading_prefixes = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
-    if block.startswith(heading_prefixes):
-        return BlockType.HEADING
-    
-    # Check for code block (starts with ''' and new line, ends with ''')   
-    lines = block.split('\n')
-    if len(lines) > 1 and lines[0] == ("```") and lines[-1] == ("```"):
-        return BlockType.CODE
-
-    ## code_block_prefix = ("```\n")
-    ## if block.startswith(code_block_prefix) and block.endswith("```"):
-    ##     return BlockType.CODE
-
-    # Check for quote block (every line starts with >)
-    lines = block.split("\n")
-    is_quote = True
+def markdown_to_blocks_many(markdowns, executor=None, chunksize=256):
+    # [markdown_to_blocks(markdown) for markdown in markdowns] in one call,
+    # optionally split into chunks of chunksize documents run in executor
+    # (a thread or process pool)
+    if executor is not None:
+        return map_chunks(executor, markdown_to_blocks_many, markdowns, chunksize)
+    return [markdown_to_blocks(markdown) for markdown in markdowns]
 
+# Same blocks as markdown_to_blocks(file.read()), but reads one line at a
+# time and yields each block as soon as the blank line after it is found,
+# so only the current block is ever in memory. Works on any iterable of
+# lines (an open file, io.StringIO, a list of lines ending in "\n").
+def iter_markdown_blocks(lines):
+    block_lines = []
     for line in lines:
-        leading_white_spaces_stripped_line = line.lstrip()
-        if leading_white_spaces_stripped_line:
-            first_non_space_character = leading_white_spaces_stripped_line[0]
-        
-            if first_non_space_character != ">":
-                is_quote = False
-                break
-        
+        if line == "\n":
+            if block_lines:
+                block = "".join(block_lines).strip()
+                if block:
+                    yield block
+                block_lines = []
         else:
-            is_quote = False
-            break
-  
-    if is_quote:
-        return BlockType.QUOTE
-    
-    # Check for unordered list (every line starts with "- ")
+            block_lines.append(line)
+
+    if block_lines:
+        block = "".join(block_lines).strip()
+        if block:
+            yield block
+
+_HEADING_PREFIXES = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
+_ORDERED_PREFIXES = [f"{count}. " for count in range(1000)]
+
+# Decides the BlockType of a block from a single split of its lines and
+# returns it together with those lines, so later stages never need to split
+# the block again. Every check stops at the first line that fails it.
+def classify_block(block):
     lines = block.split("\n")
-        
+
+    if block.startswith(_HEADING_PREFIXES):
+        return BlockType.HEADING, lines
+
+    # Code block: first and last of at least two lines are exactly ```
+    if len(lines) > 1 and lines[0] == "```" and lines[-1] == "```":
+        return BlockType.CODE, lines
+
+    # Quote block: every line starts with ">" after optional whitespace
     for line in lines:
-        if not line.startswith("- "):
+        if not line.lstrip().startswith(">"):
             break
     else:
-        return BlockType.UNORDERED_LIST
-
-    # Check for ordered list (every line starts with "1. 2. 3. and so on")
-    lines = block.split("\n")
-
-    count = 1
+        return BlockType.QUOTE, lines
 
+    # Unordered list: every line starts with "- "
     for line in lines:
-        if not line.startswith(f"{count}. "):
+        if not line.startswith("- "):
             break
-        count += 1
     else:
-        return BlockType.ORDERED_LIST
+        return BlockType.UNORDERED_LIST, lines
 
-    """
-    Code Draft - 1 
-    count = 1
-    is_ordered_list = True
+    # Ordered list: lines start with "1. ", "2. ", "3. " and so on
+    for count, line in enumerate(lines, 1):
+        prefix = _ORDERED_PREFIXES[count] if count < len(_ORDERED_PREFIXES) else f"{count}. "
+        if not line.startswith(prefix):
+            break
+    else:
+        return BlockType.ORDERED_LIST, lines
 
-    for line in lines:
-        if line.startswith(f"{count}. "):
-            count += 1
-            continue
+    # Registered block types only see the blocks no built-in type claims
+    for block_type, detect in _CUSTOM_BLOCK_TYPES:
+        if detect(block, lines):
+            return block_type, lines
+
+    return BlockType.PARAGRAPH, lines
+
+def block_to_block_type(block):
+    return classify_block(block)[0]
+
+# -------------------------------------------------------------------------
+# Page title
+# -------------------------------------------------------------------------
+
+def text_nodes_to_plain_text(nodes):
+    # The text a reader sees, without markup: link text, image alt text and
+    # the text inside nested emphasis
+    parts = []
+    for node in nodes:
+        if node.children is not None:
+            parts.append(text_nodes_to_plain_text(node.children))
         else:
-            is_ordered_list = False
-            break
+            parts.append(node.text)
+    return "".join(parts)
+
+def extract_title(markdown):
+    # Plain text of the first BlockType.HEADING block, "" when there is
+    # none. Finds the same blocks as markdown_to_blocks, but stops at the
+    # heading instead of splitting the whole document.
+    start = 0
+    while start < len(markdown):
+        end = markdown.find("\n\n", start)
+        if end == -1:
+            end = len(markdown)
+        block = markdown[start:end].strip()
+        if block.startswith(_HEADING_PREFIXES):
+            level = len(block) - len(block.lstrip("#"))
+            return text_nodes_to_plain_text(text_to_textnodes(block[level + 1:]))
+        start = end + 2
+    return ""
+
+# -------------------------------------------------------------------------
+# Turning markdown into an HTML node tree
+# -------------------------------------------------------------------------
+
+def text_to_children(text):
+    return [text_node_to_html_node(node) for node in text_to_textnodes(text)]
+
+def element(tag, children):
+    # A ParentNode needs children: an element left without any (an empty
+    # document, a "****" rule, an empty list item) renders as <tag></tag>
+    if not children:
+        return LeafNode(tag, "")
+    return ParentNode(tag, children)
+
+# Every renderer takes the block and the lines classify_block already split
+# it into; lines is only computed when it is not given.
+
+def paragraph_to_html_node(block, lines=None):
+    paragraph = block.replace("\n", " ")
+    return element("p", text_to_children(paragraph))
+
+def heading_to_html_node(block, lines=None):
+    level = len(block) - len(block.lstrip("#"))
+    text = block[level + 1:]
+    return element(f"h{level}", text_to_children(text))
+
+def code_to_html_node(block, lines=None):
+    # Code is not parsed for inline markdown, only the ``` fences are removed
+    text = block[4:-3]
+    code = LeafNode("code", text)
+    return ParentNode("pre", [code])
+
+def quote_to_html_node(block, lines=None):
+    if lines is None:
+        lines = block.split("\n")
+    stripped = [line.lstrip()[1:].strip() for line in lines]
+    return element("blockquote", text_to_children(" ".join(stripped)))
+
+def unordered_list_to_html_node(block, lines=None):
+    if lines is None:
+        lines = block.split("\n")
+    items = []
+    for line in lines:
+        # Skip the "- " marker
+        items.append(element("li", text_to_children(line[2:])))
+    return ParentNode("ul", items)
+
+def ordered_list_to_html_node(block, lines=None):
+    if lines is None:
+        lines = block.split("\n")
+    items = []
+    for count, line in enumerate(lines, 1):
+        # Skip the "<count>. " marker
+        text = line[len(str(count)) + 2:]
+        items.append(element("li", text_to_children(text)))
+    return ParentNode("ol", items)
+
+# BlockType -> function building the HTMLNode of a block
+_BLOCK_NODE_RENDERERS = {
+    BlockType.PARAGRAPH: paragraph_to_html_node,
+    BlockType.HEADING: heading_to_html_node,
+    BlockType.CODE: code_to_html_node,
+    BlockType.QUOTE: quote_to_html_node,
+    BlockType.UNORDERED_LIST: unordered_list_to_html_node,
+    BlockType.ORDERED_LIST: ordered_list_to_html_node,
+}
+
+def block_to_html_node(block):
+    block_type, lines = classify_block(block)
+    renderer = _BLOCK_NODE_RENDERERS.get(block_type)
+    if renderer is None:
+        raise ValueError("Unsupported BlockType")
+    return renderer(block, lines)
+
+def markdown_to_html_node(markdown):
+    blocks = markdown_to_blocks(markdown)
+    children = [block_to_html_node(block) for block in blocks]
+    return element("div", children)
+
+
+# -------------------------------------------------------------------------
+# Fast path: markdown straight to HTML
+#
+# Same output as markdown_to_html_node(markdown).to_html(), empty elements
+# included, but no TextNode is turned into a LeafNode and no ParentNode
+# tree is built.
+# -------------------------------------------------------------------------
+
+def text_to_html(text):
+    return text_nodes_to_html(text_to_textnodes(text))
+
+def paragraph_to_html(block, lines):
+    return f"<p>{text_to_html(block.replace(chr(10), ' '))}</p>"
+
+def heading_to_html(block, lines):
+    level = len(block) - len(block.lstrip("#"))
+    return f"<h{level}>{text_to_html(block[level + 1:])}</h{level}>"
+
+def code_to_html(block, lines):
+    return f"<pre><code>{escape_html(block[4:-3])}</code></pre>"
+
+def quote_to_html(block, lines):
+    stripped = [line.lstrip()[1:].strip() for line in lines]
+    return f"<blockquote>{text_to_html(' '.join(stripped))}</blockquote>"
+
+def unordered_list_to_html(block, lines):
+    items = "".join(f"<li>{text_to_html(line[2:])}</li>" for line in lines)
+    return f"<ul>{items}</ul>"
+
+def ordered_list_to_html(block, lines):
+    items = "".join(
+        f"<li>{text_to_html(line[len(str(count)) + 2:])}</li>"
+        for count, line in enumerate(lines, 1)
+    )
+    return f"<ol>{items}</ol>"
+
+_BLOCK_HTML_RENDERERS = {
+    BlockType.PARAGRAPH: paragraph_to_html,
+    BlockType.HEADING: heading_to_html,
+    BlockType.CODE: code_to_html,
+    BlockType.QUOTE: quote_to_html,
+    BlockType.UNORDERED_LIST: unordered_list_to_html,
+    BlockType.ORDERED_LIST: ordered_list_to_html,
+}
+
+def block_to_html(block):
+    block_type, lines = classify_block(block)
+    renderer = _BLOCK_HTML_RENDERERS.get(block_type)
+    if renderer is None:
+        raise ValueError("Unsupported BlockType")
+    return renderer(block, lines)
+
+def markdown_to_html(markdown):
+    parts = [block_to_html(block) for block in markdown_to_blocks(markdown)]
+    return f"<div>{''.join(parts)}</div>"
+
+
+# -------------------------------------------------------------------------
+# Custom block types
+#
+# A block type outside BlockType (any hashable name, for example a member of
+# another Enum) plugs into both render paths with register_block_type:
+#
+#   detect(block, lines)        True if the block is of this type
+#   to_html_node(block, lines)  the block's HTMLNode
+#   to_html(block, lines)       the block's HTML, to_html_node(...).to_html()
+#                               when not given
+#
+# Register at import time, before building: worker processes and the block
+# cache only see types registered when they start.
+# -------------------------------------------------------------------------
+
+# [(block type, detect)] in registration order, the first match wins
+_CUSTOM_BLOCK_TYPES = []
+
+def register_block_type(block_type, detect, to_html_node, to_html=None):
+    if block_type in _BLOCK_NODE_RENDERERS:
+        raise ValueError(f"Block type {block_type} is already registered")
+    if to_html is None:
+        to_html = lambda block, lines: to_html_node(block, lines).to_html()
+    _CUSTOM_BLOCK_TYPES.append((block_type, detect))
+    _BLOCK_NODE_RENDERERS[block_type] = to_html_node
+    _BLOCK_HTML_RENDERERS[block_type] = to_html
+
+def unregister_block_type(block_type):
+    if isinstance(block_type, BlockType):
+        raise ValueError(f"Built-in block type {block_type} can not be unregistered")
+    _CUSTOM_BLOCK_TYPES[:] = [(registered, detect) for registered, detect in _CUSTOM_BLOCK_TYPES
+                              if registered != block_type]
+    _BLOCK_NODE_RENDERERS.pop(block_type, None)
+    _BLOCK_HTML_RENDERERS.pop(block_type, None)
+
+def custom_block_types():
+    # Names of the registered block types, part of every block cache key
+    return tuple(str(block_type) for block_type, detect in _CUSTOM_BLOCK_TYPES)
 
-    if is_ordered_list:
-        return BlockType.ORDERED_LIST
- """
-    
-    return BlockType.PARAGRAPH
\ No newline at end of file
@@ -0,0 +1,203 @@
+import json
+import os
+import time
+import tracemalloc
+
+import block_cache
+import markdown_blocks
+
+# -------------------------------------------------------------------------
+# Per-stage profiling for site builds
+#
+# instrument() wraps the functions behind each stage of the pipeline, so
+# nothing is timed (and nothing costs anything) unless a build asks for it.
+# Stages nest: block_to_html calls classify_block, text_to_textnodes
+# and so on, and every stage only counts its own (exclusive) time and
+# allocated bytes. The
+# "page" stage wraps a whole page, so its own time is whatever no other
+# stage covers (decoding, hashing, block cache lookups).
+# -------------------------------------------------------------------------
+
+# module -> {function name: stage}
+INSTRUMENTED = {
+    block_cache: {
+        "markdown_to_blocks": "split_blocks",
+        "block_to_html": "render_block",
+    },
+    markdown_blocks: {
+        "markdown_to_blocks": "split_blocks",
+        "classify_block": "classify",
+        "text_to_textnodes": "inline",
+        "text_node_to_html_node": "convert",
+        "text_nodes_to_html": "convert",
+    },
+}
+
+
+class StageStats:
+    __slots__ = ("seconds", "calls", "allocated")
+
+    def __init__(self, seconds: float = 0.0, calls: int = 0, allocated: int = 0):
+        self.seconds = seconds
+        self.calls = calls
+        self.allocated = allocated
+
+    def add(self, other):
+        self.seconds += other.seconds
+        self.calls += other.calls
+        self.allocated += other.allocated
+
+    def to_list(self):
+        return [self.seconds, self.calls, self.allocated]
+
+    def __repr__(self):
+        return f"StageStats(seconds={self.seconds:.6f}, calls={self.calls}, allocated={self.allocated})"
+
+
+class Profiler:
+    # trace=True also keeps one Chrome trace event per stage call,
+    # memory=True records the bytes each stage leaves allocated (through
+    # tracemalloc, which slows everything down noticeably)
+    def __init__(self, trace: bool = False, memory: bool = False):
+        self.trace = trace
+        self.memory = memory
+        self.stages = {}
+        self.events = []
+        # One [start_ns, time spent in nested stages, memory at start, bytes
+        # allocated by nested stages] per open stage
+        self.stack = []
+
+    def start(self, name):
+        memory = tracemalloc.get_traced_memory()[0] if self.memory else 0
+        self.stack.append([time.perf_counter_ns(), 0, memory, 0])
+
+    def stop(self, name, detail=None):
+        end = time.perf_counter_ns()
+        start, nested, memory, nested_allocated = self.stack.pop()
+        elapsed = end - start
+        allocated = max(0, tracemalloc.get_traced_memory()[0] - memory) if self.memory else 0
+        if self.stack:
+            self.stack[-1][1] += elapsed
+            self.stack[-1][3] += allocated
+
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        stats.seconds += (elapsed - nested) / 1e9
+        stats.calls += 1
+        stats.allocated += max(0, allocated - nested_allocated)
+        if self.trace:
+            event = {
+                "name": name, "ph": "X", "pid": os.getpid(), "tid": 0,
+                "ts": start / 1000, "dur": elapsed / 1000,
+            }
+            if detail is not None:
+                event["args"] = {"detail": detail}
+            self.events.append(event)
+
+    def stage(self, name, detail=None):
+        return _Stage(self, name, detail)
+
+    def wrap(self, name, func):
+        def timed(*args, **kwargs):
+            self.start(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.stop(name)
+        timed.__wrapped__ = func
+        return timed
+
+    def take(self):
+        # Everything recorded since the last take(), as plain data that can
+        # cross a process boundary
+        recorded = {
+            "stages": {name: stats.to_list() for name, stats in self.stages.items()},
+            "events": self.events,
+        }
+        self.stages = {}
+        self.events = []
+        return recorded
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "detail")
+
+    def __init__(self, profiler, name, detail):
+        self.profiler = profiler
+        self.name = name
+        self.detail = detail
+
+    def __enter__(self):
+        self.profiler.start(self.name)
+
+    def __exit__(self, *exc_info):
+        self.profiler.stop(self.name, self.detail)
+
+# -------------------------------------------------------------------------
+# Installing the hooks
+# -------------------------------------------------------------------------
+
+_originals = {}
+_started_tracemalloc = False
+
+
+def instrument(profiler):
+    global _started_tracemalloc
+    uninstrument()
+    if profiler.memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    for module, functions in INSTRUMENTED.items():
+        for function_name, stage in functions.items():
+            original = getattr(module, function_name)
+            _originals[(module, function_name)] = original
+            setattr(module, function_name, profiler.wrap(stage, original))
+
+
+def uninstrument():
+    global _started_tracemalloc
+    for (module, function_name), original in _originals.items():
+        setattr(module, function_name, original)
+    _originals.clear()
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+
+def is_instrumented():
+    return bool(_originals)
+
+# -------------------------------------------------------------------------
+# Build-wide report
+# -------------------------------------------------------------------------
+
+class BuildProfile:
+    def __init__(self):
+        self.stages = {}
+        self.pages = []      # (seconds, path)
+        self.events = []
+
+    def add_page(self, path, seconds, recorded):
+        self.pages.append((seconds, path))
+        for name, values in recorded["stages"].items():
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats()
+            stats.add(StageStats(*values))
+        self.events.extend(recorded["events"])
+
+    def report(self, top=10):
+        lines = [f"{'stage':<16} {'seconds':>10} {'calls':>10} {'allocated':>12}"]
+        for name, stats in sorted(self.stages.items(), key=lambda item: -item[1].seconds):
+            lines.append(f"{name:<16} {stats.seconds:10.4f} {stats.calls:10d} {stats.allocated:12d}")
+        lines.append("")
+        lines.append(f"slowest {min(top, len(self.pages))} of {len(self.pages)} pages:")
+        for seconds, path in sorted(self.pages, reverse=True)[:top]:
+            lines.append(f"{seconds * 1000:10.2f} ms  {path}")
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        # Chrome trace-event format, loadable in chrome://tracing or Perfetto
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
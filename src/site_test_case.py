@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+# -------------------------------------------------------------------------
+# Shared fixture for tests that build a site: a temporary directory with
+# content/ and public/ in it
+# -------------------------------------------------------------------------
+
+class SiteTestCase(unittest.TestCase):
+    # relative path -> markdown of the pages every test starts with
+    PAGES = {}
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        for relative, text in self.PAGES.items():
+            self.write(relative, text)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def source(self, relative):
+        return os.path.join(self.content, relative)
+
+    def write(self, relative, text):
+        # bytes are written as they are, for sources that are not valid UTF-8
+        path = self.source(relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb" if isinstance(text, bytes) else "w") as f:
+            f.write(text)
+
+    def read(self, relative, public=None):
+        with open(os.path.join(public or self.public, relative)) as f:
+            return f.read()
+
+    def read_all(self, public=None):
+        # relative path -> HTML of every page in public
+        public = public or self.public
+        outputs = {}
+        for dirpath, dirnames, filenames in os.walk(public):
+            for filename in filenames:
+                if filename.endswith(".html"):
+                    path = os.path.join(dirpath, filename)
+                    with open(path) as f:
+                        outputs[os.path.relpath(path, public)] = f.read()
+        return outputs
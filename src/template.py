@@ -0,0 +1,78 @@
+import os
+import re
+
+# -------------------------------------------------------------------------
+# Page templates
+#
+# A template is an HTML file with {{ name }} slots, for example
+#
+#   <html><head><title>{{ title }}</title></head><body>{{ content }}</body></html>
+#
+# It is compiled once into the static text between the slots and the slot
+# names, so rendering a page only joins those segments with the page's
+# values: no re-reading the file and no str.replace over the whole template
+# per page. A compiled Template is never changed after it is built, so any
+# number of threads can render with it; every process keeps its own copies,
+# see load_template.
+# -------------------------------------------------------------------------
+
+_SLOT_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class Template:
+    __slots__ = ("segments", "slots")
+
+    def __init__(self, source: str):
+        # segments[0], slots[0], segments[1], slots[1], ..., segments[-1]
+        parts = _SLOT_RE.split(source)
+        self.segments = tuple(parts[0::2])
+        self.slots = tuple(parts[1::2])
+
+    def values_for(self, values):
+        # The value of every slot, in order
+        try:
+            return [values[slot] for slot in self.slots]
+        except KeyError as error:
+            raise ValueError(f"Template slot {{{{ {error.args[0]} }}}} has no value") from None
+
+    def iter_render(self, values):
+        # Yields the rendered page in chunks. values maps slot names to
+        # strings, which are inserted as they are (escape them first), or to
+        # HTMLNodes, which are streamed with iter_html.
+        segments = self.segments
+        yield segments[0]
+        for index, value in enumerate(self.values_for(values), 1):
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value.iter_html()
+            yield segments[index]
+
+    def write(self, sink, values):
+        # Writes the rendered page to anything with a write(str) method
+        for chunk in self.iter_render(values):
+            sink.write(chunk)
+
+    def render(self, values):
+        return "".join(self.iter_render(values))
+
+    def __repr__(self):
+        return f"Template(slots={list(self.slots)})"
+
+
+# Compiled templates of this process by path, with the (mtime, size) they
+# were compiled at. Worker processes get the path and compile the template
+# the first time they render with it, instead of receiving a copy with
+# every page.
+_templates = {}
+
+def load_template(path):
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _templates.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(path, encoding="utf-8") as f:
+        template = Template(f.read())
+    _templates[path] = (version, template)
+    return template
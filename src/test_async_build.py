@@ -0,0 +1,107 @@
+import os
+import unittest
+
+from async_build import async_build_site, read_sources, render_batch, render_sources, write_outputs
+from build_site import build_site, load_manifest, template_hash
+from site_test_case import SiteTestCase
+
+
+class TestAsyncBuildSite(SiteTestCase):
+    PAGES = {f"section{index % 3}/page{index}.md": f"# Page {index}\n\nSome **text** and a [link](/{index})\n"
+             for index in range(20)}
+
+    def test_matches_build_site(self):
+        expected_public = os.path.join(self.tmp.name, "expected")
+        expected = build_site(self.content, expected_public, jobs=1)
+        for jobs in (1, 2):
+            public = os.path.join(self.tmp.name, f"public{jobs}")
+            result = async_build_site(self.content, public, jobs=jobs)
+            self.assertEqual(self.read_all(public), self.read_all(expected_public))
+            self.assertEqual(load_manifest(public).keys(), load_manifest(expected_public).keys())
+            self.assertEqual(
+                [os.path.relpath(page, public) for page in result.pages],
+                [os.path.relpath(page, expected_public) for page in expected.pages],
+            )
+
+    def test_manifest_matches_build_site(self):
+        build_site(self.content, self.public, jobs=1)
+        expected = load_manifest(self.public)
+        async_build_site(self.content, self.public, jobs=1, force=True)
+        self.assertEqual(load_manifest(self.public), expected)
+
+    def test_smallest_queue_and_batch(self):
+        result = async_build_site(self.content, self.public, jobs=2, queue_size=1, batch_size=1)
+        self.assertEqual(len(result.pages), 20)
+
+    def test_batches_larger_than_the_site(self):
+        result = async_build_site(self.content, self.public, jobs=2, batch_size=100)
+        self.assertEqual(len(result.pages), 20)
+
+    def test_queue_and_batch_size_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            async_build_site(self.content, self.public, queue_size=0)
+        with self.assertRaises(ValueError):
+            async_build_site(self.content, self.public, batch_size=0)
+
+    def test_incremental(self):
+        async_build_site(self.content, self.public, jobs=1)
+        self.write("section0/page0.md", "# Changed\n")
+        os.remove(os.path.join(self.content, "section1", "page1.md"))
+        result = async_build_site(self.content, self.public, jobs=1)
+        self.assertEqual(result.pages, [os.path.join(self.public, "section0", "page0.html")])
+        self.assertEqual(len(result.skipped), 18)
+        self.assertEqual(result.removed, [os.path.join(self.public, "section1", "page1.html")])
+
+    def test_template_matches_build_site(self):
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w") as f:
+            f.write("<title>{{ title }}</title>{{ content }}")
+        expected_public = os.path.join(self.tmp.name, "expected")
+        build_site(self.content, expected_public, jobs=1, template_path=template)
+        async_build_site(self.content, self.public, jobs=2, template_path=template)
+        self.assertEqual(self.read_all(), self.read_all(expected_public))
+        self.assertEqual(load_manifest(self.public, template_hash(template)),
+                         load_manifest(expected_public, template_hash(template)))
+
+    def test_render_batch_writes_pages_and_returns_metadata(self):
+        batch = [(os.path.join(self.content, "section0", "page0.md"), os.path.join(self.public, "page0.html"))]
+        expected_html = render_sources(read_sources(batch))[0][3]
+        pages = render_batch(batch)
+        self.assertEqual(self.read("page0.html"), expected_html)
+        self.assertEqual(pages[0]["output"], os.path.join(self.public, "page0.html"))
+        # No markdown or HTML comes back, only paths, hashes, counts and timings
+        self.assertIsNone(pages[0]["document"])
+        for value in pages[0].values():
+            self.assertFalse(isinstance(value, (str, bytes)) and "Page 0" in str(value))
+
+    def test_failed_write_leaves_the_output_untouched(self):
+        async_build_site(self.content, self.public, jobs=1)
+        destination = os.path.join(self.public, "section0", "page0.html")
+        before = self.read(destination)
+        # A lone surrogate can not be encoded, the write fails halfway
+        with self.assertRaises(UnicodeEncodeError):
+            write_outputs([(self.source("section0/page0.md"), destination, "hash", "<p>ok</p>\ud800",
+                            0, 0, None, False, 0.0)])
+        self.assertEqual(self.read(destination), before)
+        self.assertEqual([name for name in os.listdir(os.path.dirname(destination)) if name.endswith(".tmp")], [])
+
+    def test_empty_pages(self):
+        self.write("empty.md", "")
+        self.write("list.md", "- a\n- \n- b\n")
+        for jobs in (1, 2):
+            result = async_build_site(self.content, self.public, jobs=jobs, force=True)
+            self.assertEqual((len(result.pages), result.errors), (22, []))
+            self.assertEqual(self.read_all()["empty.html"], "<div></div>")
+
+    def test_broken_page_is_reported_and_the_rest_is_built(self):
+        self.write("broken.md", b"\xff")
+        for jobs in (1, 2):
+            public = os.path.join(self.tmp.name, f"public{jobs}")
+            result = async_build_site(self.content, public, jobs=jobs)
+            self.assertEqual(len(result.pages), 20)
+            self.assertEqual([source for source, error in result.errors], [os.path.join(self.content, "broken.md")])
+            self.assertNotIn("broken.html", self.read_all(public))
+            self.assertEqual(len(load_manifest(public)), 20)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from benchmark import SUITE, compare_results, run_suite
+
+
+def results(**cases):
+    return {"size": 1000, "results": cases}
+
+
+class TestCompareResults(unittest.TestCase):
+    def test_no_regression_within_threshold(self):
+        baseline = results(parse=1.0, render=2.0)
+        current = results(parse=1.05, render=1.5)
+        self.assertEqual(compare_results(baseline, current, 0.10), [])
+
+    def test_regression_past_threshold(self):
+        baseline = results(parse=1.0, render=2.0)
+        current = results(parse=1.2, render=2.0)
+        self.assertEqual(compare_results(baseline, current, 0.10), [("parse", 1.0, 1.2)])
+
+    def test_missing_and_new_cases_are_not_regressions(self):
+        baseline = results(parse=1.0)
+        current = results(render=5.0)
+        self.assertEqual(compare_results(baseline, current, 0.10), [])
+
+
+class TestRunSuite(unittest.TestCase):
+    def test_every_case_runs_on_a_tiny_corpus(self):
+        output = run_suite(size=500, repeat=1)
+        self.assertEqual(set(output["results"]), set(SUITE))
+        self.assertEqual(output["size"], 500)
+        for seconds in output["results"].values():
+            self.assertGreaterEqual(seconds, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
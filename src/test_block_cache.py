@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from block_cache import BlockCache, block_key
+from markdown_blocks import markdown_to_html_node
+
+MARKDOWN = """
+# Title
+
+A paragraph with **bold** and a [link](https://boot.dev?a=1&b=2)
+
+```
+code _stays_ as is, <escaped> once
+```
+
+- one
+- two
+"""
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_output_matches_markdown_to_html_node(self):
+        cache = BlockCache()
+        self.assertEqual(
+            cache.markdown_to_html_node(MARKDOWN).to_html(),
+            markdown_to_html_node(MARKDOWN).to_html(),
+        )
+        self.assertEqual(cache.markdown_to_html(MARKDOWN), markdown_to_html_node(MARKDOWN).to_html())
+
+    def test_hits_and_misses(self):
+        cache = BlockCache()
+        cache.markdown_to_html_node(MARKDOWN)
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+        cache.markdown_to_html_node(MARKDOWN)
+        self.assertEqual((cache.hits, cache.misses), (4, 4))
+
+    def test_only_changed_block_misses(self):
+        cache = BlockCache()
+        cache.markdown_to_html_node(MARKDOWN)
+        html = cache.markdown_to_html_node(MARKDOWN.replace("# Title", "# New title")).to_html()
+        self.assertEqual((cache.hits, cache.misses), (3, 5))
+        self.assertIn("<h1>New title</h1>", html)
+
+    def test_least_recently_used_block_is_evicted(self):
+        cache = BlockCache(max_entries=2)
+        cache.render_block("first")
+        cache.render_block("second")
+        cache.render_block("first")
+        cache.render_block("third")
+        self.assertEqual(len(cache), 2)
+        self.assertIn(block_key("first"), cache.entries)
+        self.assertNotIn(block_key("second"), cache.entries)
+
+    def test_max_entries_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            BlockCache(max_entries=0)
+
+    def test_disk_store_is_shared_between_caches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            BlockCache(directory=directory).render_block("A **bold** paragraph")
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+            cache = BlockCache(directory=directory)
+            self.assertEqual(cache.render_block("A **bold** paragraph"), "<p>A <b>bold</b> paragraph</p>")
+            self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_get_unknown_block(self):
+        cache = BlockCache()
+        self.assertIsNone(cache.get("never rendered"))
+        self.assertEqual(cache.misses, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
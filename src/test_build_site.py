@@ -0,0 +1,241 @@
+import contextlib
+import io
+import os
+import unittest
+
+from async_build import async_build_site
+from build_site import MANIFEST_NAME, build_site, find_pages, load_manifest, render_page
+from main import main
+from site_test_case import SiteTestCase
+
+
+class TestBuildSite(SiteTestCase):
+    PAGES = {
+        "index.md": "# Home\n\nWelcome to the **site**\n",
+        "blog/first.md": "# First post\n\n- one\n- two\n",
+        "blog/notes.txt": "not markdown",
+    }
+
+    def test_find_pages(self):
+        pages = find_pages(self.content, self.public)
+        self.assertEqual(
+            pages,
+            [
+                (os.path.join(self.content, "index.md"), os.path.join(self.public, "index.html")),
+                (os.path.join(self.content, "blog", "first.md"), os.path.join(self.public, "blog", "first.html")),
+            ],
+        )
+
+    def test_build_site_single_process(self):
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(len(result.pages), 2)
+        self.assertEqual(self.read("index.html"), "<div><h1>Home</h1><p>Welcome to the <b>site</b></p></div>")
+        self.assertEqual(self.read("blog/first.html"), "<div><h1>First post</h1><ul><li>one</li><li>two</li></ul></div>")
+
+    def test_build_site_process_pool_matches_single_process(self):
+        build_site(self.content, self.public, jobs=1)
+        expected = [self.read("index.html"), self.read("blog/first.html")]
+        build_site(self.content, self.public, jobs=2)
+        self.assertEqual([self.read("index.html"), self.read("blog/first.html")], expected)
+
+    def test_build_site_empty_content(self):
+        empty = os.path.join(self.tmp.name, "empty")
+        os.makedirs(empty)
+        result = build_site(empty, os.path.join(self.tmp.name, "empty_public"), jobs=2)
+        self.assertEqual(result.pages, [])
+
+    def test_build_site_missing_content_keeps_the_site(self):
+        build_site(self.content, self.public, jobs=1)
+        for build in (build_site, async_build_site):
+            with self.assertRaises(FileNotFoundError):
+                build(os.path.join(self.tmp.name, "contnet"), self.public, jobs=1)
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = main(["build", "--content", os.path.join(self.tmp.name, "contnet"), "--public", self.public])
+        self.assertEqual(status, 1)
+        self.assertIn("does not exist", stderr.getvalue())
+        self.assertEqual(len(load_manifest(self.public)), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+
+    # --------------------------------------------------------------------------
+    # Incremental builds
+    # --------------------------------------------------------------------------
+
+    def test_manifest_is_written(self):
+        build_site(self.content, self.public, jobs=1)
+        self.assertTrue(os.path.exists(os.path.join(self.public, MANIFEST_NAME)))
+
+    def test_unchanged_pages_are_skipped(self):
+        build_site(self.content, self.public, jobs=1)
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(result.pages, [])
+        self.assertEqual(len(result.skipped), 2)
+
+    def test_only_changed_page_is_rebuilt(self):
+        build_site(self.content, self.public, jobs=1)
+        self.write("blog/first.md", "# Edited post\n")
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(result.pages, [os.path.join(self.public, "blog", "first.html")])
+        self.assertEqual(self.read("blog/first.html"), "<div><h1>Edited post</h1></div>")
+
+    def test_touched_but_identical_page_is_skipped(self):
+        build_site(self.content, self.public, jobs=1)
+        path = os.path.join(self.content, "index.md")
+        os.utime(path, ns=(0, 0))
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(result.pages, [])
+
+    def test_missing_output_is_rebuilt(self):
+        build_site(self.content, self.public, jobs=1)
+        os.remove(os.path.join(self.public, "index.html"))
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(result.pages, [os.path.join(self.public, "index.html")])
+
+    def test_deleted_source_removes_output(self):
+        build_site(self.content, self.public, jobs=1)
+        os.remove(os.path.join(self.content, "blog", "first.md"))
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(result.removed, [os.path.join(self.public, "blog", "first.html")])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "first.html")))
+
+    def test_force_rebuilds_everything(self):
+        build_site(self.content, self.public, jobs=1)
+        result = build_site(self.content, self.public, jobs=1, force=True)
+        self.assertEqual(len(result.pages), 2)
+
+    def test_block_cache_dir_is_reused_by_later_builds(self):
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        first = build_site(self.content, self.public, jobs=1, block_cache_dir=cache_dir)
+        self.assertEqual((first.block_hits, first.block_misses), (0, 4))
+        second = build_site(self.content, self.public, jobs=2, force=True, block_cache_dir=cache_dir)
+        self.assertEqual((second.block_hits, second.block_misses), (4, 0))
+        self.assertEqual(self.read("index.html"), "<div><h1>Home</h1><p>Welcome to the <b>site</b></p></div>")
+
+    def test_corrupt_manifest_rebuilds_everything(self):
+        build_site(self.content, self.public, jobs=1)
+        with open(os.path.join(self.public, MANIFEST_NAME), "w") as f:
+            f.write("{not json")
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(len(result.pages), 2)
+
+
+    # --------------------------------------------------------------------------
+    # Empty and broken pages
+    # --------------------------------------------------------------------------
+
+    def test_empty_pages_and_elements(self):
+        self.write("empty.md", "")
+        self.write("rule.md", "____\n\n****\n")
+        self.write("list.md", "- a\n- \n- b\n")
+        for jobs in (1, 2):
+            result = build_site(self.content, self.public, jobs=jobs, force=True)
+            self.assertEqual((len(result.pages), result.errors), (5, []))
+            self.assertEqual(self.read("empty.html"), "<div></div>")
+            self.assertEqual(self.read("rule.html"), "<div><p></p><p></p></div>")
+            self.assertEqual(self.read("list.html"), "<div><ul><li>a</li><li></li><li>b</li></ul></div>")
+
+    def test_broken_page_is_reported_and_the_rest_is_built(self):
+        self.write("broken.md", b"# \xff\xfe\n")
+        for jobs in (1, 2):
+            result = build_site(self.content, self.public, jobs=jobs, force=True)
+            self.assertEqual(len(result.pages), 2)
+            self.assertEqual([source for source, error in result.errors], [os.path.join(self.content, "broken.md")])
+            self.assertIn("UnicodeDecodeError", result.errors[0][1])
+            self.assertFalse(os.path.exists(os.path.join(self.public, "broken.html")))
+            self.assertEqual(sorted(load_manifest(self.public)), [os.path.join("blog", "first.md"), "index.md"])
+
+        # Only the broken page is tried again
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual((result.pages, len(result.skipped), len(result.errors)), ([], 2, 1))
+
+    def test_broken_page_keeps_its_previous_output(self):
+        build_site(self.content, self.public, jobs=1)
+        before = self.read("index.html")
+        entry = load_manifest(self.public)["index.md"]
+        self.write("index.md", b"# \xff\n")
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(len(result.errors), 1)
+        self.assertEqual(result.removed, [])
+        self.assertEqual(self.read("index.html"), before)
+        self.assertEqual(load_manifest(self.public)["index.md"]["source_hash"], entry["source_hash"])
+
+        self.write("index.md", "# Fixed\n")
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(result.pages, [os.path.join(self.public, "index.html")])
+        self.assertEqual(self.read("index.html"), "<div><h1>Fixed</h1></div>")
+
+    def test_failed_render_leaves_the_output_untouched(self):
+        # The missing slot only fails while the page is being written
+        build_site(self.content, self.public, jobs=1)
+        before = self.read("index.html")
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w") as f:
+            f.write("{{ content }}{{ missing }}")
+        with self.assertRaises(ValueError):
+            render_page(os.path.join(self.content, "index.md"), os.path.join(self.public, "index.html"),
+                        template_path=template)
+        self.assertEqual(self.read("index.html"), before)
+        self.assertEqual(sorted(os.listdir(self.public)), [MANIFEST_NAME, "blog", "index.html"])
+
+    def test_main_reports_broken_pages(self):
+        self.write("broken.md", b"\xff")
+        stdout, stderr = io.StringIO(), io.StringIO()
+        for extra in ([], ["--asyncio"]):
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                status = main(["build", "--content", self.content, "--public", self.public, "--jobs", "1",
+                               "--force"] + extra)
+            self.assertEqual(status, 1)
+            self.assertIn("broken.md: UnicodeDecodeError", stderr.getvalue())
+        self.assertIn("Built 2 pages", stdout.getvalue())
+
+
+    # --------------------------------------------------------------------------
+    # Page templates
+    # --------------------------------------------------------------------------
+
+    def write_template(self, text):
+        path = os.path.join(self.tmp.name, "template.html")
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_template_wraps_every_page(self):
+        template = self.write_template("<title>{{ title }}</title><body>{{ content }}</body>")
+        self.write("blog/first.md", "Intro\n\n## First & <best> post\n")
+        build_site(self.content, self.public, jobs=1, template_path=template)
+        self.assertEqual(
+            self.read("index.html"),
+            "<title>Home</title><body><div><h1>Home</h1><p>Welcome to the <b>site</b></p></div></body>",
+        )
+        self.assertEqual(
+            self.read("blog/first.html"),
+            "<title>First &amp; &lt;best&gt; post</title><body><div><p>Intro</p>"
+            "<h2>First &amp; &lt;best&gt; post</h2></div></body>",
+        )
+
+    def test_template_process_pool_matches_single_process(self):
+        template = self.write_template("<title>{{ title }}</title>{{ content }}")
+        build_site(self.content, self.public, jobs=1, template_path=template)
+        expected = [self.read("index.html"), self.read("blog/first.html")]
+        build_site(self.content, self.public, jobs=2, force=True, template_path=template)
+        self.assertEqual([self.read("index.html"), self.read("blog/first.html")], expected)
+
+    def test_changed_template_rebuilds_everything(self):
+        template = self.write_template("<main>{{ content }}</main>")
+        build_site(self.content, self.public, jobs=1, template_path=template)
+        self.assertEqual(build_site(self.content, self.public, jobs=1, template_path=template).pages, [])
+
+        self.write_template("<article>{{ content }}</article>")
+        result = build_site(self.content, self.public, jobs=1, template_path=template)
+        self.assertEqual(len(result.pages), 2)
+        self.assertTrue(self.read("index.html").startswith("<article>"))
+
+        # Dropping the template is a change too
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(len(result.pages), 2)
+        self.assertNotEqual(load_manifest(self.public), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
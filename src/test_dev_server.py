@@ -0,0 +1,204 @@
+import contextlib
+import http.client
+import io
+import os
+import threading
+import unittest
+import urllib.request
+
+from build_site import build_site, load_manifest
+from dev_server import (
+    RELOAD_PATH,
+    RELOAD_SCRIPT,
+    DevSite,
+    InotifyWatcher,
+    PollingWatcher,
+    ReloadNotifier,
+    make_server,
+)
+from site_test_case import SiteTestCase
+
+
+class ContentDirectory(SiteTestCase):
+    PAGES = {
+        "index.md": "# Home\n",
+        "blog/first.md": "First **post**\n",
+    }
+
+
+class TestWatchers(ContentDirectory):
+    def check_watcher(self, watcher):
+        try:
+            self.assertEqual(watcher.wait(timeout=0), set())
+
+            self.write("blog/first.md", "Changed, and longer than before\n")
+            self.assertIn(self.source("blog/first.md"), watcher.wait(timeout=2))
+
+            self.write("blog/second.md", "New\n")
+            self.assertIn(self.source("blog/second.md"), watcher.wait(timeout=2))
+
+            os.remove(self.source("index.md"))
+            self.assertIn(self.source("index.md"), watcher.wait(timeout=2))
+        finally:
+            watcher.close()
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher(self.content, interval=0.01))
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher(self.content)
+        except (OSError, AttributeError):
+            self.skipTest("inotify is not available")
+        self.check_watcher(watcher)
+
+    def test_inotify_watches_new_directories(self):
+        try:
+            watcher = InotifyWatcher(self.content)
+        except (OSError, AttributeError):
+            self.skipTest("inotify is not available")
+        try:
+            os.makedirs(self.source("docs"))
+            self.assertIn(self.source("docs"), watcher.wait(timeout=2))
+            self.write("docs/page.md", "Docs\n")
+            self.assertIn(self.source("docs/page.md"), watcher.wait(timeout=2))
+        finally:
+            watcher.close()
+
+
+class TestDevSite(ContentDirectory):
+    def setUp(self):
+        super().setUp()
+        build_site(self.content, self.public, jobs=1)
+        self.site = DevSite(self.content, self.public)
+
+    def test_rebuilds_only_changed_pages(self):
+        self.write("blog/first.md", "First _edit_\n")
+        result = self.site.rebuild({self.source("blog/first.md")})
+        self.assertEqual(result.pages, [os.path.join(self.public, "blog", "first.html")])
+        self.assertEqual(self.read("blog/first.html"), "<div><p>First <i>edit</i></p></div>")
+
+    def test_skips_pages_whose_content_did_not_change(self):
+        os.utime(self.source("index.md"), ns=(0, 0))
+        result = self.site.rebuild({self.source("index.md")})
+        self.assertEqual(result.pages, [])
+        self.assertEqual(len(result.skipped), 1)
+
+    def test_removes_deleted_pages(self):
+        os.remove(self.source("blog/first.md"))
+        result = self.site.rebuild({self.source("blog/first.md"), self.source("notes.txt")})
+        self.assertEqual(result.removed, [os.path.join(self.public, "blog", "first.html")])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "first.html")))
+
+    def test_directory_events(self):
+        self.write("docs/a.md", "A\n")
+        self.write("docs/b.md", "B\n")
+        result = self.site.rebuild({self.source("docs")})
+        self.assertEqual(len(result.pages), 2)
+
+        for name in ("a.md", "b.md"):
+            os.remove(self.source(os.path.join("docs", name)))
+        os.rmdir(self.source("docs"))
+        result = self.site.rebuild({self.source("docs")})
+        self.assertEqual(len(result.removed), 2)
+
+    def test_broken_page_does_not_stop_the_rebuild(self):
+        self.write("index.md", b"\xff")
+        self.write("blog/first.md", "Still fine\n")
+        before = self.read("index.html")
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            result = self.site.rebuild({self.source("index.md"), self.source("blog/first.md")})
+        self.assertIn("index.md: 'utf-8' codec can't decode", stderr.getvalue())
+        self.assertEqual(result.pages, [os.path.join(self.public, "blog", "first.html")])
+        # The last good version stays served
+        self.assertEqual(self.read("index.html"), before)
+
+    def test_save_writes_the_manifest(self):
+        self.write("blog/first.md", "Edited\n")
+        self.site.rebuild({self.source("blog/first.md")})
+        self.site.save()
+        self.assertEqual(load_manifest(self.public), self.site.manifest)
+        result = build_site(self.content, self.public, jobs=1)
+        self.assertEqual(result.pages, [])
+
+    def test_template(self):
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w") as f:
+            f.write("<title>{{ title }}</title>{{ content }}")
+        build_site(self.content, self.public, jobs=1, template_path=template)
+        site = DevSite(self.content, self.public, template_path=template)
+        self.write("index.md", "# New home\n")
+        result = site.rebuild({self.source("index.md")})
+        self.assertEqual(result.pages, [os.path.join(self.public, "index.html")])
+        self.assertEqual(self.read("index.html"), "<title>New home</title><div><h1>New home</h1></div>")
+        site.save()
+        self.assertEqual(build_site(self.content, self.public, jobs=1, template_path=template).pages, [])
+
+    def test_document_cache(self):
+        path = os.path.join(self.tmp.name, "documents.bin")
+        site = DevSite(self.content, self.public, document_cache_path=path)
+        self.write("blog/first.md", "First _edit_\n")
+        site.rebuild({self.source("blog/first.md")})
+        site.save()
+        result = build_site(self.content, self.public, jobs=1, force=True, document_cache_path=path)
+        self.assertEqual(result.document_hits, 1)
+        self.assertEqual(self.read("blog/first.html"), "<div><p>First <i>edit</i></p></div>")
+
+    def test_url_paths(self):
+        outputs = [os.path.join(self.public, "index.html"), os.path.join(self.public, "blog", "first.html")]
+        self.assertEqual(self.site.url_paths(outputs), ["/index.html", "/", "/blog/first.html"])
+
+
+class TestServer(ContentDirectory):
+    def setUp(self):
+        super().setUp()
+        build_site(self.content, self.public, jobs=1)
+        self.notifier = ReloadNotifier()
+        self.server = make_server(self.public, self.notifier, port=0, log_requests=False)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.notifier.close()
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def get(self, path):
+        with urllib.request.urlopen(f"http://127.0.0.1:{self.port}{path}", timeout=5) as response:
+            return response.read()
+
+    def test_pages_get_the_reload_script(self):
+        page = self.get("/blog/first.html")
+        self.assertEqual(page, b"<div><p>First <b>post</b></p></div>" + RELOAD_SCRIPT)
+        self.assertEqual(self.get("/"), self.get("/index.html"))
+
+    def test_other_files_are_served_as_they_are(self):
+        with open(os.path.join(self.public, "style.css"), "w") as f:
+            f.write("body {}")
+        self.assertEqual(self.get("/style.css"), b"body {}")
+
+    def test_reload_events(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        try:
+            connection.request("GET", RELOAD_PATH)
+            response = connection.getresponse()
+            self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+            self.notifier.notify(["/blog/first.html"])
+            self.assertEqual(response.readline(), b'data: ["/blog/first.html"]\n')
+        finally:
+            connection.close()
+
+
+class TestReloadNotifier(unittest.TestCase):
+    def test_wait_returns_every_change_since_version(self):
+        notifier = ReloadNotifier()
+        notifier.notify(["/a.html"])
+        notifier.notify(["/b.html"])
+        self.assertEqual(notifier.wait(0, timeout=0), (2, ["/a.html", "/b.html"]))
+        self.assertEqual(notifier.wait(2, timeout=0), (2, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
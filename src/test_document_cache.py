@@ -0,0 +1,145 @@
+import os
+import tempfile
+import unittest
+
+from async_build import async_build_site
+from build_site import build_site, content_hash
+from document_cache import MAGIC, DocumentCache, document_key
+from markdown_blocks import register_block_type, unregister_block_type
+from site_test_case import SiteTestCase
+
+
+def key(name):
+    return document_key(content_hash(name.encode("utf-8")))
+
+
+class TestDocumentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "documents.bin")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_missing_file_is_empty(self):
+        cache = DocumentCache(self.path)
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get(key("a")))
+        self.assertEqual(cache.misses, 1)
+
+    def test_saved_documents_are_found_by_a_new_instance(self):
+        cache = DocumentCache(self.path)
+        documents = {key(f"page {index}"): f"<div><p>page {index} é</p></div>" for index in range(100)}
+        for document, html in documents.items():
+            cache.put(document, html)
+        cache.save(set(documents))
+
+        loaded = DocumentCache(self.path)
+        self.assertEqual(len(loaded), 100)
+        for document, html in documents.items():
+            self.assertEqual(loaded.get(document), html)
+        self.assertIsNone(loaded.get(key("unknown")))
+        self.assertEqual((loaded.hits, loaded.misses), (100, 1))
+
+    def test_save_keeps_only_the_given_keys(self):
+        cache = DocumentCache(self.path)
+        cache.put(key("a"), "<div>a</div>")
+        cache.put(key("b"), "<div>b</div>")
+        cache.save({key("a"), key("b")})
+        cache.put(key("c"), "<div>c</div>")
+        cache.save({key("b"), key("c")})
+
+        loaded = DocumentCache(self.path)
+        self.assertIsNone(loaded.get(key("a")))
+        self.assertEqual(loaded.get(key("b")), "<div>b</div>")
+        self.assertEqual(loaded.get(key("c")), "<div>c</div>")
+
+    def test_unchanged_cache_is_not_rewritten(self):
+        cache = DocumentCache(self.path)
+        cache.put(key("a"), "<div>a</div>")
+        cache.save({key("a")})
+        os.utime(self.path, ns=(0, 0))
+        cache = DocumentCache(self.path)
+        cache.save({key("a")})
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+
+    def test_damaged_files_are_empty(self):
+        cache = DocumentCache(self.path)
+        cache.put(key("a"), "<div>a</div>")
+        cache.save({key("a")})
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        for damaged in (b"", b"not a cache", MAGIC + b"\xff\xff\xff\xff", data[:-5]):
+            with open(self.path, "wb") as f:
+                f.write(damaged)
+            self.assertIsNone(DocumentCache(self.path).get(key("a")), repr(damaged))
+
+    def test_is_current(self):
+        cache = DocumentCache(self.path)
+        self.assertTrue(cache.is_current())
+        other = DocumentCache(self.path)
+        other.put(key("a"), "<div>a</div>")
+        other.save({key("a")})
+        self.assertFalse(cache.is_current())
+
+    def test_parser_version_is_part_of_the_key(self):
+        before = key("a")
+        register_block_type("table", lambda block, lines: False, None)
+        try:
+            self.assertNotEqual(key("a"), before)
+        finally:
+            unregister_block_type("table")
+        self.assertEqual(key("a"), before)
+
+
+class TestBuildWithDocumentCache(SiteTestCase):
+    PAGES = {f"page{index}.md": f"# Page {index}\n\nSome **text** & more\n" for index in range(10)}
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp.name, "documents.bin")
+
+    def test_forced_build_reuses_documents(self):
+        expected_public = os.path.join(self.tmp.name, "expected")
+        build_site(self.content, expected_public, jobs=1)
+
+        first = build_site(self.content, self.public, jobs=1, document_cache_path=self.path)
+        self.assertEqual(first.document_hits, 0)
+        self.assertEqual(len(DocumentCache(self.path)), 10)
+        for jobs in (1, 2):
+            result = build_site(self.content, self.public, jobs=jobs, force=True, document_cache_path=self.path)
+            self.assertEqual(result.document_hits, 10)
+            self.assertEqual(result.block_misses, 0)
+            self.assertEqual(self.read_all(), self.read_all(expected_public))
+
+    def test_changed_and_deleted_pages(self):
+        build_site(self.content, self.public, jobs=1, document_cache_path=self.path)
+        self.write("page0.md", "Changed\n")
+        os.remove(os.path.join(self.content, "page1.md"))
+        result = build_site(self.content, self.public, jobs=1, force=True, document_cache_path=self.path)
+        self.assertEqual(result.document_hits, 8)
+        self.assertEqual(len(DocumentCache(self.path)), 9)
+        self.assertEqual(self.read_all()["page0.html"], "<div><p>Changed</p></div>")
+
+    def test_template_change_reuses_documents(self):
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w") as f:
+            f.write("<title>{{ title }}</title>{{ content }}")
+        build_site(self.content, self.public, jobs=1, document_cache_path=self.path)
+        result = build_site(self.content, self.public, jobs=1, template_path=template,
+                            document_cache_path=self.path)
+        self.assertEqual(result.document_hits, 10)
+        self.assertEqual(self.read_all()["page3.html"],
+                         "<title>Page 3</title><div><h1>Page 3</h1><p>Some <b>text</b> &amp; more</p></div>")
+
+    def test_async_build(self):
+        build_site(self.content, self.public, jobs=1, document_cache_path=self.path)
+        expected = self.read_all()
+        result = async_build_site(self.content, self.public, jobs=2, force=True, document_cache_path=self.path)
+        self.assertEqual(result.document_hits, 10)
+        self.assertEqual(self.read_all(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
 from platform import node
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, escape_html
 
 # --------------------------------------------------------------------------
 # Tests for HTMLNode class
@@ -35,6 +36,10 @@ class TestHTMLNode(unittest.TestCase):
         node = HTMLNode("div", "This is a div", children=None, props={"class": "container"})
         self.assertEqual(repr(node), "HTMLNode(tag=div, value=This is a div, children=None, props={'class': 'container'})")
 
+    def test_no_instance_dict(self):
+        for node in (HTMLNode("p", "text"), LeafNode("b", "bold"), ParentNode("div", [LeafNode("b", "bold")])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
     def test_repr_no_props(self):
         node = HTMLNode("span", "This is a span", children=None)
         self.assertEqual(repr(node), "HTMLNode(tag=span, value=This is a span, children=None, props=None)")
@@ -153,5 +158,108 @@ class TestParentNode(unittest.TestCase):
             "<div><span><b><i>great-grandchild</i></b></span></div>"
         )
 
+# --------------------------------------------------------------------------
+# Tests for iter_html / write_html
+# --------------------------------------------------------------------------
+
+class TestStreamingHTML(unittest.TestCase):
+    def make_tree(self):
+        return ParentNode(
+            "div",
+            [
+                LeafNode("h1", "Title"),
+                ParentNode("p", [
+                    LeafNode("b", "Bold text"),
+                    LeafNode(None, "Normal text"),
+                    LeafNode("a", "link", props={"href": "https://www.google.com"}),
+                ]),
+                LeafNode("img", "", props={"src": "a.png", "alt": "An image"}),
+            ],
+            props={"class": "container"},
+        )
+
+    def test_iter_html_matches_to_html(self):
+        node = self.make_tree()
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+
+    def test_write_html_matches_to_html(self):
+        node = self.make_tree()
+        sink = io.StringIO()
+        node.write_html(sink)
+        self.assertEqual(sink.getvalue(), node.to_html())
+
+    def test_write_html_leaf_node(self):
+        sink = io.StringIO()
+        LeafNode("p", "This is a paragraph").write_html(sink)
+        self.assertEqual(sink.getvalue(), "<p>This is a paragraph</p>")
+
+    def test_iter_html_with_no_children_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            list(ParentNode("div", []).iter_html())
+
+    def test_iter_html_with_no_value_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            list(ParentNode("div", [LeafNode("p", None)]).iter_html())
+
+    def test_to_html_deeper_than_recursion_limit(self):
+        depth = 10_000
+        node = LeafNode("b", "deep")
+        for _ in range(depth):
+            node = ParentNode("blockquote", [node])
+        self.assertEqual(
+            node.to_html(),
+            "<blockquote>" * depth + "<b>deep</b>" + "</blockquote>" * depth,
+        )
+
+    def test_to_html_nested_invalid_child_raises_value_error(self):
+        node = ParentNode("div", [LeafNode("p", "ok"), ParentNode("span", [])])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+class TestCachedRendering(unittest.TestCase):
+    def test_props_cache_follows_changes(self):
+        props = {"href": "https://boot.dev"}
+        node = LeafNode("a", "link", props)
+        self.assertEqual(node.to_html(), '<a href="https://boot.dev">link</a>')
+        props["href"] = "https://example.com"
+        self.assertEqual(node.to_html(), '<a href="https://example.com">link</a>')
+        props["target"] = "_blank"
+        self.assertEqual(node.props_to_html(), ' href="https://example.com" target="_blank"')
+        node.props = {"href": "/"}
+        self.assertEqual(node.to_html(), '<a href="/">link</a>')
+
+    def test_equal_but_differently_rendered_values(self):
+        self.assertEqual(HTMLNode(props={"tabindex": 1}).props_to_html(), ' tabindex="1"')
+        self.assertEqual(HTMLNode(props={"tabindex": True}).props_to_html(), ' tabindex="True"')
+        self.assertEqual(HTMLNode(props={"tabindex": 1.0}).props_to_html(), ' tabindex="1.0"')
+
+    def test_unhashable_values(self):
+        self.assertEqual(HTMLNode(props={"class": ["a", "b"]}).props_to_html(), ' class="[\'a\', \'b\']"')
+
+    def test_known_and_unknown_tags(self):
+        node = ParentNode("section", [ParentNode("p", [LeafNode("b", "x")]), ParentNode("aside", [LeafNode(None, "y")])])
+        self.assertEqual(node.to_html(), "<section><p><b>x</b></p><aside>y</aside></section>")
+
+
+class TestEscaping(unittest.TestCase):
+    def test_escape_html(self):
+        self.assertEqual(escape_html('a < b & "c" > d'), "a &lt; b &amp; &quot;c&quot; &gt; d")
+        self.assertEqual(escape_html("&amp;"), "&amp;amp;")
+        self.assertEqual(escape_html("it's"), "it's")
+        self.assertEqual(escape_html(""), "")
+
+    def test_leaf_values_are_escaped(self):
+        self.assertEqual(LeafNode("p", "1 < 2 & 3").to_html(), "<p>1 &lt; 2 &amp; 3</p>")
+        self.assertEqual(LeafNode(None, "<script>").to_html(), "&lt;script&gt;")
+
+    def test_prop_values_are_escaped(self):
+        node = LeafNode("a", "link", props={"href": '/search?q="x"&page=2'})
+        self.assertEqual(node.to_html(), '<a href="/search?q=&quot;x&quot;&amp;page=2">link</a>')
+
+    def test_raw_values_are_not_escaped(self):
+        node = ParentNode("div", [LeafNode(None, "<b>bold</b>", raw=True), LeafNode("p", "<i>", raw=True)])
+        self.assertEqual(node.to_html(), "<div><b>bold</b><p><i></p></div>")
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,14 +1,18 @@
 import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from inline_markdown import (
     extract_markdown_links,
     extract_markdown_images,
+    iter_markdown_images,
+    iter_markdown_links,
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes,
     split_nodes_delimiter,
+    text_to_textnodes_many,
     )
 
-from textnode import TextNode, TextType
+from textnode import TextNode, TextNodeView, TextType
 
 class TestInlineMarkdown(unittest.TestCase):
     def test_extract_markdown_images(self):
@@ -353,6 +357,32 @@ class TestInlineMarkdown(unittest.TestCase):
             new_nodes,
         )
 
+    def test_split_nodes_link_with_repeated_link(self):
+        node = TextNode(
+            "[same](https://same.com) and again [same](https://same.com)",
+            TextType.TEXT,
+        )
+        new_nodes = split_nodes_link([node])
+        self.assertListEqual(
+            [
+                TextNode("same", TextType.LINK, "https://same.com"),
+                TextNode(" and again ", TextType.TEXT),
+                TextNode("same", TextType.LINK, "https://same.com"),
+            ],
+            new_nodes,
+        )
+
+    def test_iter_markdown_links_spans(self):
+        text = "a [b](c) d [e](f)"
+        matches = list(iter_markdown_links(text))
+        self.assertEqual([match.span() for match in matches], [(2, 8), (11, 17)])
+        self.assertEqual([match.groups() for match in matches], [("b", "c"), ("e", "f")])
+
+    def test_iter_markdown_images_skips_links(self):
+        text = "[link](a) ![image](b)"
+        self.assertEqual([match.groups() for match in iter_markdown_images(text)], [("image", "b")])
+        self.assertEqual([match.groups() for match in iter_markdown_links(text)], [("link", "a")])
+
     # --------------------------------------------------------------------------
     # Tests for text_to_textnodes function
     # --------------------------------------------------------------------------
@@ -460,4 +490,217 @@ class TestInlineMarkdown(unittest.TestCase):
                 TextNode(" and a ", TextType.TEXT),
                 TextNode("link", TextType.LINK, "https://boot.dev"),
             ], nodes
-        )
\ No newline at end of file
+        )
+
+    # --------------------------------------------------------------------------
+    # Without nesting, the single pass text_to_textnodes must match the old
+    # five pass pipeline
+    # --------------------------------------------------------------------------
+
+    def five_pass_text_to_textnodes(self, text):
+        nodes = [TextNode(text, TextType.TEXT)]
+        nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+        nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+        nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+        nodes = split_nodes_image(nodes)
+        return split_nodes_link(nodes)
+
+    def test_text_to_textnodes_matches_five_pass_pipeline(self):
+        texts = [
+            "",
+            "a****b",
+            "**bold** then _italic_ and `code`",
+            "![img](https://a.png)[link](https://b.com)",
+            "[a ![b](c)](d)",
+            "[a](b ![c) d](e)",
+            "![a*b](c*d) and * **x**",
+            "line one [no\nlink](x) line two",
+        ]
+        for text in texts:
+            self.assertListEqual(self.five_pass_text_to_textnodes(text), text_to_textnodes(text), text)
+
+    def test_text_to_textnodes_unclosed_brackets(self):
+        # A link would have to contain the image, so neither bracket is one
+        text = "see [1] and **also** in [2], see _notes_ ![i](/i) [b]\n(/c)"
+        self.assertListEqual(
+            [
+                TextNode("see [1] and ", TextType.TEXT),
+                TextNode("also", TextType.BOLD),
+                TextNode(" in [2], see ", TextType.TEXT),
+                TextNode("notes", TextType.ITALIC),
+                TextNode(" ", TextType.TEXT),
+                TextNode("i", TextType.IMAGE, "/i"),
+                TextNode(" [b]\n(/c)", TextType.TEXT),
+            ],
+            text_to_textnodes(text),
+        )
+
+    def test_text_to_textnodes_unmatched_delimiters_stay_text(self):
+        for text in ["**bold", "a_b", "`open", "_a_b", "x ** y"]:
+            self.assertEqual("".join(node.text for node in text_to_textnodes(text)),
+                             text.replace("_a_", "a"), text)
+        self.assertListEqual(
+            [
+                TextNode("a **b", TextType.ITALIC),
+                TextNode(" c**", TextType.TEXT),
+            ],
+            text_to_textnodes("_a **b_ c**"),
+        )
+        self.assertListEqual(
+            [
+                TextNode("`a ", TextType.TEXT),
+                TextNode("b", TextType.BOLD),
+            ],
+            text_to_textnodes("`a **b**"),
+        )
+
+    def test_text_to_textnodes_nested_emphasis(self):
+        self.assertListEqual(
+            [
+                TextNode(None, TextType.ITALIC, children=[
+                    TextNode("a ", TextType.TEXT),
+                    TextNode("b", TextType.BOLD),
+                    TextNode(" c", TextType.TEXT),
+                ]),
+            ],
+            text_to_textnodes("_a **b** c_"),
+        )
+        self.assertListEqual(
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode(None, TextType.BOLD, children=[
+                    TextNode(None, TextType.ITALIC, children=[
+                        TextNode("the ", TextType.TEXT),
+                        TextNode("docs", TextType.LINK, "https://boot.dev/docs"),
+                    ]),
+                ]),
+            ],
+            text_to_textnodes("see **_the [docs](https://boot.dev/docs)_**"),
+        )
+
+    def test_text_to_textnodes_code_and_links_win_over_emphasis(self):
+        self.assertListEqual(
+            [TextNode("a **b** _c_", TextType.CODE)],
+            text_to_textnodes("`a **b** _c_`"),
+        )
+        self.assertListEqual(
+            [
+                TextNode("x", TextType.LINK, "http://a_b_c"),
+                TextNode("_", TextType.TEXT),
+            ],
+            text_to_textnodes("[x](http://a_b_c)_"),
+        )
+
+    def test_text_to_textnodes_many_unmatched_delimiters(self):
+        # Every other opener is left unmatched inside the pair around it
+        nodes = text_to_textnodes("_a **b " * 20_000)
+        self.assertListEqual(
+            [
+                TextNode("a **b ", TextType.ITALIC),
+                TextNode("a ", TextType.TEXT),
+                TextNode("b _a ", TextType.BOLD),
+                TextNode("b ", TextType.TEXT),
+            ],
+            nodes[:4],
+        )
+        self.assertEqual(TextNode("a **b ", TextType.TEXT), nodes[-1])
+
+    def test_split_nodes_delimiter_unmatched_stays_text(self):
+        nodes = split_nodes_delimiter([TextNode("a `b` c `d", TextType.TEXT)], "`", TextType.CODE)
+        self.assertListEqual(
+            [
+                TextNode("a ", TextType.TEXT),
+                TextNode("b", TextType.CODE),
+                TextNode(" c `d", TextType.TEXT),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_empty_delimiters_split_text(self):
+        self.assertListEqual(
+            [
+                TextNode("a", TextType.TEXT),
+                TextNode("b", TextType.TEXT),
+            ],
+            text_to_textnodes("a__b"),
+        )
+
+    def test_long_pieces_are_views(self):
+        words = "word " * 40
+        text = f"{words}**{words}** `{words}`"
+        nodes = text_to_textnodes(text)
+        self.assertEqual(
+            nodes,
+            [
+                TextNode(words, TextType.TEXT),
+                TextNode(words, TextType.BOLD),
+                TextNode(" ", TextType.TEXT),
+                TextNode(words, TextType.CODE),
+            ],
+        )
+        self.assertEqual([type(node) for node in nodes], [TextNodeView, TextNodeView, TextNode, TextNodeView])
+        self.assertTrue(all(node.source is text for node in nodes if isinstance(node, TextNodeView)))
+
+    def test_split_passes_on_views_match_copies(self):
+        words = "word " * 20
+        text = f"{words}**{words}**{words}_a_ ![alt]({words}) [{words}](/x) `c`"
+        view = TextNodeView("!" + text + "!", 1, len(text) + 1, TextType.TEXT)
+        for nodes in ([view], [TextNode(text, TextType.TEXT)]):
+            nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+            nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            nodes = split_nodes_link(split_nodes_image(nodes))
+            self.assertEqual(
+                nodes,
+                [
+                    TextNode(words, TextType.TEXT),
+                    TextNode(words, TextType.BOLD),
+                    TextNode(words, TextType.TEXT),
+                    TextNode("a", TextType.ITALIC),
+                    TextNode(" ", TextType.TEXT),
+                    TextNode("alt", TextType.IMAGE, words),
+                    TextNode(" ", TextType.TEXT),
+                    TextNode(words, TextType.LINK, "/x"),
+                    TextNode(" ", TextType.TEXT),
+                    TextNode("c", TextType.CODE),
+                ],
+            )
+
+    def test_plain_nodes_split_into_plain_nodes(self):
+        words = "word " * 20
+        for text in (f"{words}**{words}** a ** b ** c **", f"{words}[{words}](/x){words}![{words}](/i)"):
+            view = TextNodeView(text, 0, len(text), TextType.TEXT)
+            nodes = split_nodes_link(split_nodes_image(split_nodes_delimiter([TextNode(text, TextType.TEXT)],
+                                                                             "**", TextType.BOLD)))
+            views = split_nodes_link(split_nodes_image(split_nodes_delimiter([view], "**", TextType.BOLD)))
+            self.assertEqual(nodes, views)
+            self.assertEqual({type(node) for node in nodes}, {TextNode})
+
+    def test_split_nodes_link_on_a_view_after_an_exclamation_mark(self):
+        # The "!" before the view is not part of its text, so this is a link
+        source = "!" + "[link](/x)" + " " * 100
+        view = TextNodeView(source, 1, len(source), TextType.TEXT)
+        self.assertEqual(split_nodes_link([view])[0], TextNode("link", TextType.LINK, "/x"))
+
+
+class TestTextToTextNodesMany(unittest.TestCase):
+    TEXTS = ["", "plain text", "a **bold** b", "`code` and [link](/x)", "unmatched _ and **", "x " * 100]
+
+    def test_matches_one_call_per_text(self):
+        self.assertEqual(text_to_textnodes_many(self.TEXTS), [text_to_textnodes(text) for text in self.TEXTS])
+        self.assertEqual(text_to_textnodes_many(iter(self.TEXTS)), text_to_textnodes_many(self.TEXTS))
+        self.assertEqual(text_to_textnodes_many([]), [])
+
+    def test_executors(self):
+        texts = self.TEXTS * 5
+        expected = [text_to_textnodes(text) for text in texts]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(text_to_textnodes_many(texts, executor, chunksize=4), expected)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(text_to_textnodes_many(texts, executor, chunksize=7), expected)
+
+    def test_chunksize_must_be_positive(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with self.assertRaises(ValueError):
+                text_to_textnodes_many(self.TEXTS, executor, chunksize=0)
+
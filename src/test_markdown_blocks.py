@@ -1,9 +1,18 @@
+import io
+import os
+import tempfile
 import unittest
 import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
 
-from markdown_blocks import markdown_to_blocks
+from markdown_blocks import markdown_to_blocks, iter_markdown_blocks, markdown_to_blocks_many
 
-from markdown_blocks import BlockType, block_to_block_type
+from markdown_blocks import BlockType, block_to_block_type, classify_block, markdown_to_html_node
+from markdown_blocks import block_to_html, block_to_html_node, markdown_to_html
+from markdown_blocks import extract_title, register_block_type, unregister_block_type
+from block_cache import block_key
+from htmlnode import LeafNode, ParentNode
 
 class TestMarkdownBlocks(unittest.TestCase):
     # Basic splitting into blocks
@@ -316,3 +325,284 @@ Fourth Item
         block_type = block_to_block_type(ordered_list_block)
         self.assertEqual(block_type, BlockType.PARAGRAPH)
         
+
+
+# --------------------------------------------------------------------------
+# Tests for classify_block
+# --------------------------------------------------------------------------
+
+class TestClassifyBlock(unittest.TestCase):
+    def test_returns_type_and_lines(self):
+        block = "1. First Item\n2. Second Item\n3. Third Item"
+        self.assertEqual(
+            classify_block(block),
+            (BlockType.ORDERED_LIST, ["1. First Item", "2. Second Item", "3. Third Item"]),
+        )
+
+    def test_single_line_block(self):
+        self.assertEqual(classify_block("# Heading"), (BlockType.HEADING, ["# Heading"]))
+
+    def test_agrees_with_block_to_block_type(self):
+        blocks = [
+            "# heading",
+            "####### not a heading",
+            "```\ncode\n```",
+            "```\nnot closed",
+            "> quote\n  > indented quote",
+            "> quote\n\n> blank line",
+            "- item\n- item",
+            "- item\n-no space",
+            "1. one\n2. two\n3. three",
+            "1. one\n3. three",
+            "just a paragraph",
+        ]
+        for block in blocks:
+            self.assertEqual(classify_block(block)[0], block_to_block_type(block), block)
+
+    def test_long_ordered_list(self):
+        block = "\n".join(f"{count}. item" for count in range(1, 1200))
+        self.assertEqual(classify_block(block)[0], BlockType.ORDERED_LIST)
+        self.assertEqual(
+            markdown_to_html_node(block).to_html(),
+            "<div><ol>" + "<li>item</li>" * 1199 + "</ol></div>",
+        )
+
+
+# --------------------------------------------------------------------------
+# Tests for iter_markdown_blocks
+# --------------------------------------------------------------------------
+
+class TestIterMarkdownBlocks(unittest.TestCase):
+    def test_matches_markdown_to_blocks(self):
+        documents = [
+            "",
+            "\n\n\n",
+            "single block",
+            "\nleading newline",
+            "a\n\n\nb",
+            "a\n\n\n\nb\n\n",
+            "a\n  \nb",
+            "a\n \n\nb",
+            "# Heading\n\nThis is a paragraph\non two lines\n\n- a list\n- with items\n",
+            "   indented\n\n\t\n\ntrailing   ",
+        ]
+        for markdown in documents:
+            self.assertEqual(
+                list(iter_markdown_blocks(io.StringIO(markdown))),
+                markdown_to_blocks(markdown),
+                repr(markdown),
+            )
+
+    def test_markdown_to_blocks_many(self):
+        documents = ["", "\n\n\n", "a\n\n\nb", "# Heading\n\n  text  \n\n- a\n- b\n", "   indented\n\n\t\n\ntrailing   "]
+        expected = [markdown_to_blocks(markdown) for markdown in documents]
+        self.assertEqual(markdown_to_blocks_many(documents), expected)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(markdown_to_blocks_many(documents * 3, executor, chunksize=2), expected * 3)
+
+    def test_yields_blocks_lazily(self):
+        lines = iter(["first block\n", "\n", "second block\n"])
+        blocks = iter_markdown_blocks(lines)
+        self.assertEqual(next(blocks), "first block")
+        # The second block has not been read yet
+        self.assertEqual(next(lines), "second block\n")
+
+    def test_reads_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "page.md")
+            with open(path, "w") as f:
+                f.write("# Title\n\nSome text\nmore text\n")
+            with open(path) as f:
+                self.assertEqual(list(iter_markdown_blocks(f)), ["# Title", "Some text\nmore text"])
+
+
+# --------------------------------------------------------------------------
+# Tests for markdown_to_html_node
+# --------------------------------------------------------------------------
+
+class TestMarkdownToHTMLNode(unittest.TestCase):
+    def test_paragraphs(self):
+        md = """
+This is **bolded** paragraph
+text in a p
+tag here
+
+This is another paragraph with _italic_ text and `code` here
+
+"""
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            "<div><p>This is <b>bolded</b> paragraph text in a p tag here</p><p>This is another paragraph with <i>italic</i> text and <code>code</code> here</p></div>",
+        )
+
+    def test_codeblock(self):
+        md = """
+```
+This is text that _should_ remain
+the **same** even with inline stuff
+```
+"""
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
+        )
+
+    def test_headings(self):
+        md = """
+# Title with a [link](https://boot.dev)
+
+###### Smallest heading
+"""
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            '<div><h1>Title with a <a href="https://boot.dev">link</a></h1><h6>Smallest heading</h6></div>',
+        )
+
+    def test_quote(self):
+        md = """
+> This is a
+> quote with **bold**
+"""
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(html, "<div><blockquote>This is a quote with <b>bold</b></blockquote></div>")
+
+    def test_lists(self):
+        md = """
+- first _item_
+- second item
+
+1. one
+2. two
+"""
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            "<div><ul><li>first <i>item</i></li><li>second item</li></ul><ol><li>one</li><li>two</li></ol></div>",
+        )
+
+
+class TestMarkdownToHTML(unittest.TestCase):
+    def test_matches_tree(self):
+        md = """
+# Heading with **bold** and [a link](https://boot.dev)
+
+A paragraph
+over _two_ lines with `code` and ![img](https://i.imgur.com/x.png)
+
+```
+code with **stars** and <tags>
+```
+
+> quoted
+>   text
+
+- one
+- _two_
+
+1. first
+2. second
+
+###### small heading
+
+_nested **bold** and [a link](https://boot.dev/a_b)_ in an `unclosed **italic
+"""
+        self.assertEqual(markdown_to_html(md), markdown_to_html_node(md).to_html())
+
+    def test_code_is_escaped(self):
+        md = "```\nif a < b && c:\n```"
+        expected = "<div><pre><code>if a &lt; b &amp;&amp; c:\n</code></pre></div>"
+        self.assertEqual(markdown_to_html(md), expected)
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+
+    def test_block_matches_tree(self):
+        blocks = ["plain", "## two", "```\nx\n```", "> a\n> b", "- a\n- b", "1. a\n2. b"]
+        blocks.append("\n".join(f"{i}. item {i}" for i in range(1, 12)))
+        for block in blocks:
+            self.assertEqual(block_to_html(block), block_to_html_node(block).to_html())
+
+    def test_empty_elements_like_tree(self):
+        # Elements without any inline content render empty instead of raising
+        cases = {
+            "": "<div></div>",
+            "****": "<div><p></p></div>",
+            "____": "<div><p></p></div>",
+            "- a\n- ``\n- b": "<div><ul><li>a</li><li></li><li>b</li></ul></div>",
+            "1. ``": "<div><ol><li></li></ol></div>",
+            "# ``": "<div><h1></h1></div>",
+            "> ``": "<div><blockquote></blockquote></div>",
+        }
+        for md, expected in cases.items():
+            self.assertEqual(markdown_to_html_node(md).to_html(), expected, repr(md))
+            self.assertEqual(markdown_to_html(md), expected, repr(md))
+
+
+class TestExtractTitle(unittest.TestCase):
+    def test_first_heading_of_any_level(self):
+        self.assertEqual(extract_title("Intro\n\n## Second level\n\n# First level"), "Second level")
+
+    def test_inline_markup_is_removed(self):
+        md = "# The **big _one_**, `code`, [a link](/x) and ![an image](/i.png)"
+        self.assertEqual(extract_title(md), "The big one, code, a link and an image")
+
+    def test_no_heading(self):
+        for md in ("", "\n\n", "Just text", "#not a heading", "```\n# code\n```"):
+            self.assertEqual(extract_title(md), "", repr(md))
+
+    def test_same_blocks_as_markdown_to_blocks(self):
+        for md in ("a\n\n\n# Title", "  # Title  \n\nmore", "a\n# not first line\n\n## Title"):
+            headings = [b for b in markdown_to_blocks(md) if block_to_block_type(b) == BlockType.HEADING]
+            self.assertEqual(extract_title(md), headings[0].lstrip("#").strip(), repr(md))
+
+
+class ExtraBlockType(Enum):
+    TABLE = "table"
+
+
+def is_table(block, lines):
+    return all(line.startswith("|") for line in lines)
+
+
+def table_to_html_node(block, lines):
+    rows = []
+    for line in lines:
+        cells = [LeafNode("td", cell.strip()) for cell in line.strip("|").split("|")]
+        rows.append(ParentNode("tr", cells))
+    return ParentNode("table", rows)
+
+
+class TestBlockTypeRegistry(unittest.TestCase):
+    def setUp(self):
+        register_block_type(ExtraBlockType.TABLE, is_table, table_to_html_node)
+        self.addCleanup(unregister_block_type, ExtraBlockType.TABLE)
+
+    def test_classified_and_rendered(self):
+        md = "# Title\n\n| a | b |\n| c | d |"
+        self.assertEqual(block_to_block_type("| a | b |"), ExtraBlockType.TABLE)
+        expected = ("<div><h1>Title</h1><table><tr><td>a</td><td>b</td></tr>"
+                    "<tr><td>c</td><td>d</td></tr></table></div>")
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        self.assertEqual(markdown_to_html(md), expected)
+
+    def test_built_in_types_come_first(self):
+        self.assertEqual(block_to_block_type("- | a |"), BlockType.UNORDERED_LIST)
+        self.assertEqual(block_to_block_type("```\n| a |\n```"), BlockType.CODE)
+
+    def test_registered_twice(self):
+        with self.assertRaises(ValueError):
+            register_block_type(ExtraBlockType.TABLE, is_table, table_to_html_node)
+        with self.assertRaises(ValueError):
+            register_block_type(BlockType.PARAGRAPH, is_table, table_to_html_node)
+
+    def test_unregister(self):
+        key = block_key("| a |")
+        unregister_block_type(ExtraBlockType.TABLE)
+        self.assertEqual(block_to_block_type("| a |"), BlockType.PARAGRAPH)
+        self.assertEqual(markdown_to_html("| a |"), "<div><p>| a |</p></div>")
+        # Cached fragments of the registered type are not reused
+        self.assertNotEqual(block_key("| a |"), key)
+        with self.assertRaises(ValueError):
+            unregister_block_type(BlockType.PARAGRAPH)
+
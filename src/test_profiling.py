@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import markdown_blocks
+import profiling
+from build_site import build_site
+from profiling import BuildProfile, Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_nested_stages_count_exclusive_time(self):
+        profiler = Profiler()
+        with profiler.stage("outer"):
+            with profiler.stage("inner"):
+                time.sleep(0.02)
+        recorded = profiler.take()
+        outer_seconds, outer_calls, _ = recorded["stages"]["outer"]
+        inner_seconds, inner_calls, _ = recorded["stages"]["inner"]
+        self.assertEqual((outer_calls, inner_calls), (1, 1))
+        self.assertGreaterEqual(inner_seconds, 0.02)
+        self.assertLess(outer_seconds, inner_seconds)
+
+    def test_wrap_counts_calls_and_returns_result(self):
+        profiler = Profiler()
+        double = profiler.wrap("double", lambda x: x * 2)
+        self.assertEqual([double(1), double(2)], [2, 4])
+        self.assertEqual(profiler.take()["stages"]["double"][1], 2)
+
+    def test_take_resets(self):
+        profiler = Profiler()
+        with profiler.stage("once"):
+            pass
+        profiler.take()
+        self.assertEqual(profiler.take(), {"stages": {}, "events": []})
+
+    def test_trace_events(self):
+        profiler = Profiler(trace=True)
+        with profiler.stage("page", "index.md"):
+            pass
+        events = profiler.take()["events"]
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["name"], "page")
+        self.assertEqual(events[0]["ph"], "X")
+        self.assertEqual(events[0]["args"], {"detail": "index.md"})
+
+    def test_memory(self):
+        profiler = Profiler(memory=True)
+        profiling.instrument(profiler)
+        try:
+            with profiler.stage("allocate"):
+                kept = [object() for _ in range(1000)]
+        finally:
+            profiling.uninstrument()
+        self.assertGreater(profiler.take()["stages"]["allocate"][2], 0)
+        self.assertEqual(len(kept), 1000)
+
+    def test_memory_is_exclusive(self):
+        profiler = Profiler(memory=True)
+        profiling.instrument(profiler)
+        try:
+            with profiler.stage("page"):
+                with profiler.stage("allocate"):
+                    kept = bytearray(1_000_000)
+        finally:
+            profiling.uninstrument()
+        stages = profiler.take()["stages"]
+        self.assertGreaterEqual(stages["allocate"][2], 1_000_000)
+        # The page stage does not count the bytes its nested stage allocated again
+        self.assertLess(stages["page"][2], 100_000)
+        self.assertEqual(len(kept), 1_000_000)
+
+    def test_instrument_and_uninstrument(self):
+        original = markdown_blocks.classify_block
+        profiler = Profiler()
+        profiling.instrument(profiler)
+        try:
+            self.assertIsNot(markdown_blocks.classify_block, original)
+            markdown_blocks.block_to_html_node("- one\n- two")
+        finally:
+            profiling.uninstrument()
+        self.assertIs(markdown_blocks.classify_block, original)
+        stages = profiler.take()["stages"]
+        self.assertEqual(stages["classify"][1], 1)
+        self.assertEqual(stages["inline"][1], 2)
+
+
+class TestBuildProfile(unittest.TestCase):
+    def test_profiled_build(self):
+        with tempfile.TemporaryDirectory() as directory:
+            content = os.path.join(directory, "content")
+            public = os.path.join(directory, "public")
+            os.makedirs(content)
+            for name in ("a", "b"):
+                with open(os.path.join(content, f"{name}.md"), "w") as f:
+                    f.write(f"# Page {name}\n\nSome **text** on page {name}\n")
+
+            result = build_site(content, public, jobs=1, trace=True)
+            self.assertFalse(profiling.is_instrumented())
+            profile = result.profile
+            self.assertEqual(len(profile.pages), 2)
+            for stage in ("page", "read", "split_blocks", "classify", "inline", "convert", "serialize", "write"):
+                self.assertIn(stage, profile.stages)
+            self.assertIn("slowest 2 of 2 pages", profile.report())
+
+            trace_path = os.path.join(directory, "trace.json")
+            profile.write_trace(trace_path)
+            with open(trace_path) as f:
+                trace = json.load(f)
+            self.assertTrue(any(event["name"] == "page" for event in trace["traceEvents"]))
+
+    def test_build_without_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, "content"))
+            result = build_site(os.path.join(directory, "content"), os.path.join(directory, "public"))
+            self.assertIsNone(result.profile)
+
+    def test_add_page_sums_stages(self):
+        profile = BuildProfile()
+        profile.add_page("a.md", 0.1, {"stages": {"read": [0.01, 1, 10]}, "events": []})
+        profile.add_page("b.md", 0.2, {"stages": {"read": [0.02, 1, 20]}, "events": []})
+        self.assertEqual(profile.stages["read"].calls, 2)
+        self.assertEqual(profile.stages["read"].allocated, 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compiles_into_segments_and_slots(self):
+        template = Template("<title>{{ title }}</title><body>{{content}}</body>")
+        self.assertEqual(template.segments, ("<title>", "</title><body>", "</body>"))
+        self.assertEqual(template.slots, ("title", "content"))
+
+    def test_render(self):
+        template = Template("<title>{{ title }}</title>{{ content }}<p>{{ title }}</p>")
+        self.assertEqual(
+            template.render({"title": "Home", "content": "<div>x</div>"}),
+            "<title>Home</title><div>x</div><p>Home</p>",
+        )
+
+    def test_matches_str_replace(self):
+        source = "<html>{{ title }}\n{{ content }}\n</html>"
+        values = {"title": "A & B", "content": "<div>{{ title }}</div>"}
+        expected = source.replace("{{ content }}", values["content"]).replace("{{ title }}", values["title"], 1)
+        self.assertEqual(Template(source).render(values), expected)
+
+    def test_values_are_not_parsed_for_slots(self):
+        self.assertEqual(Template("{{ content }}").render({"content": "{{ title }}"}), "{{ title }}")
+
+    def test_no_slots(self):
+        self.assertEqual(Template("static").render({}), "static")
+
+    def test_missing_value(self):
+        with self.assertRaises(ValueError):
+            Template("{{ title }}").render({"content": "x"})
+
+    def test_nodes_are_streamed(self):
+        node = ParentNode("div", [LeafNode("b", "bold")])
+        template = Template("<body>{{ content }}</body>")
+        chunks = list(template.iter_render({"content": node}))
+        self.assertEqual("".join(chunks), "<body><div><b>bold</b></div></body>")
+        self.assertEqual(template.render({"content": node}), template.render({"content": node.to_html()}))
+
+    def test_pickles(self):
+        template = Template("<title>{{ title }}</title>")
+        copy = pickle.loads(pickle.dumps(template))
+        self.assertEqual((copy.segments, copy.slots), (template.segments, template.slots))
+
+
+class TestLoadTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "template.html")
+        self.write("<b>{{ content }}</b>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w") as f:
+            f.write(text)
+
+    def test_compiled_once(self):
+        self.assertIs(load_template(self.path), load_template(self.path))
+
+    def test_recompiled_after_a_change(self):
+        first = load_template(self.path)
+        self.write("<i>{{ content }}</i>")
+        os.utime(self.path, ns=(0, 0))
+        second = load_template(self.path)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.render({"content": "x"}), "<i>x</i>")
+
+
+if __name__ == "__main__":
+    unittest.main()
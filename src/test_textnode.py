@@ -1,7 +1,9 @@
 import unittest
 
-from textnode import TextNode, TextType
-from textnode import text_node_to_html_node
+import pickle
+
+from textnode import TextNode, TextNodeView, TextType, VIEW_MIN_LENGTH, text_piece, text_span
+from textnode import text_node_to_html_node, text_node_to_html, text_nodes_to_html
 
 
 class TestTextNode(unittest.TestCase):
@@ -20,6 +22,16 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.ITALIC)
         self.assertNotEqual(node, node2)
 
+    def test_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.LINK, "https://www.boot.dev")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.other = "not allowed"
+
+    def test_repr(self):
+        node = TextNode("This is some anchor text", TextType.LINK, "https://www.boot.dev")
+        self.assertEqual(repr(node), "TextNode(This is some anchor text, link, https://www.boot.dev)")
+
     
 class TestTextNodeToHtmlNode(unittest.TestCase):
     def test_text(self):
@@ -59,6 +71,123 @@ class TestTextNodeToHtmlNode(unittest.TestCase):
         self.assertEqual(html_node.to_html(), '<img src="https://www.example.com/image.png" alt="An image"/>')
 
 
+    def test_unsupported_text_type_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            text_node_to_html_node(TextNode("text", "not a text type"))
+
+
+class TestTextNodeToHtml(unittest.TestCase):
+    nodes = [
+        TextNode("plain <text>", TextType.TEXT),
+        TextNode("bold", TextType.BOLD),
+        TextNode("italic", TextType.ITALIC),
+        TextNode("print('hi')", TextType.CODE),
+        TextNode("Click here", TextType.LINK, "https://www.example.com"),
+        TextNode("An image", TextType.IMAGE, "https://www.example.com/image.png"),
+    ]
+
+    def test_matches_leaf_node_html(self):
+        for node in self.nodes:
+            self.assertEqual(text_node_to_html(node), text_node_to_html_node(node).to_html())
+
+    def test_text_nodes_to_html(self):
+        self.assertEqual(
+            text_nodes_to_html(self.nodes),
+            "".join(text_node_to_html_node(node).to_html() for node in self.nodes),
+        )
+
+    def test_missing_text_raises_value_error_like_leaf_node(self):
+        node = TextNode(None, TextType.BOLD)
+        with self.assertRaises(ValueError):
+            text_node_to_html_node(node).to_html()
+        with self.assertRaises(ValueError):
+            text_node_to_html(node)
+        with self.assertRaises(ValueError):
+            text_nodes_to_html([node])
+
+    def test_unsupported_text_type_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            text_node_to_html(TextNode("text", "not a text type"))
+
+    def test_escaping_matches_leaf_node_html(self):
+        special = 'a < b & "c" > d'
+        for text_type in TextType:
+            node = TextNode(special, text_type, special)
+            self.assertEqual(text_node_to_html(node), text_node_to_html_node(node).to_html())
+        self.assertEqual(text_node_to_html(TextNode("<", TextType.BOLD)), "<b>&lt;</b>")
+
+    def test_nested_node(self):
+        node = TextNode(None, TextType.BOLD, children=[
+            TextNode("bold ", TextType.TEXT),
+            TextNode(None, TextType.ITALIC, children=[TextNode("link", TextType.LINK, "https://boot.dev")]),
+        ])
+        html = '<b>bold <i><a href="https://boot.dev">link</a></i></b>'
+        self.assertEqual(text_node_to_html_node(node).to_html(), html)
+        self.assertEqual(text_node_to_html(node), html)
+        self.assertEqual(text_nodes_to_html([node, TextNode("!", TextType.TEXT)]), html + "!")
+
+    def test_children_need_bold_or_italic(self):
+        node = TextNode(None, TextType.CODE, children=[TextNode("x", TextType.TEXT)])
+        with self.assertRaises(ValueError):
+            text_node_to_html_node(node)
+        with self.assertRaises(ValueError):
+            text_nodes_to_html([node])
+
+    def test_children_take_part_in_eq(self):
+        self.assertNotEqual(
+            TextNode(None, TextType.BOLD, children=[TextNode("a", TextType.TEXT)]),
+            TextNode(None, TextType.BOLD, children=[TextNode("b", TextType.TEXT)]),
+        )
+
+
+
+class TestTextNodeView(unittest.TestCase):
+    def test_text_is_sliced_from_the_source(self):
+        view = TextNodeView("a **bold** b", 4, 8, TextType.BOLD)
+        self.assertEqual(view.text, "bold")
+        self.assertIs(view.text, view.text)
+
+    def test_compares_and_prints_like_a_text_node(self):
+        view = TextNodeView("see [link](/x)", 5, 9, TextType.LINK, "/x")
+        node = TextNode("link", TextType.LINK, "/x")
+        self.assertEqual(view, node)
+        self.assertEqual(node, view)
+        self.assertEqual(repr(view), repr(node))
+        self.assertNotEqual(view, TextNode("link", TextType.LINK, "/y"))
+
+    def test_pickles_as_a_text_node(self):
+        view = TextNodeView("x" * 1000 + "text", 1000, 1004, TextType.TEXT)
+        copy = pickle.loads(pickle.dumps(view))
+        self.assertIs(type(copy), TextNode)
+        self.assertEqual(copy, view)
+
+    def test_setting_text(self):
+        view = TextNodeView("abcdef", 1, 3, TextType.TEXT)
+        view.text = "new"
+        self.assertEqual(view, TextNode("new", TextType.TEXT))
+        self.assertEqual(text_span(view), ("new", 0, 3))
+
+    def test_setting_text_to_none(self):
+        # Like the text of a bold or italic node with children
+        view = TextNodeView("abcdef", 1, 3, TextType.BOLD)
+        view.text = None
+        self.assertIsNone(view.text)
+        self.assertEqual(view, TextNode(None, TextType.BOLD))
+        self.assertEqual(repr(view), repr(TextNode(None, TextType.BOLD)))
+
+    def test_renders_like_a_text_node(self):
+        view = TextNodeView("x <b> & y", 2, 7, TextType.ITALIC)
+        self.assertEqual(text_node_to_html(view), text_node_to_html(TextNode("<b> &", TextType.ITALIC)))
+        self.assertEqual(text_node_to_html_node(view).to_html(), "<i>&lt;b&gt; &amp;</i>")
+
+    def test_text_piece(self):
+        source = "a" * (VIEW_MIN_LENGTH * 2)
+        self.assertIs(type(text_piece(source, 0, VIEW_MIN_LENGTH - 1, TextType.TEXT)), TextNode)
+        long_piece = text_piece(source, 1, VIEW_MIN_LENGTH + 1, TextType.TEXT)
+        self.assertIs(type(long_piece), TextNodeView)
+        self.assertEqual(text_span(long_piece), (source, 1, VIEW_MIN_LENGTH + 1))
+        self.assertEqual(long_piece.text, "a" * VIEW_MIN_LENGTH)
+
 
 if __name__ == "__main__":
     unittest.main()
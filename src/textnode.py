@@ -1,5 +1,5 @@
 from enum import Enum
-from htmlnode import LeafNode
+from htmlnode import LeafNode, ParentNode, escape_html
 
 class TextType(Enum):
     TEXT = "text"
@@ -10,32 +10,149 @@ class TextType(Enum):
     IMAGE = "image"
 
 class TextNode:
-    def __init__(self, text: str, text_type: TextType, url: str = None):
+    # No per-instance __dict__: inline parsing creates a lot of these
+    __slots__ = ("text", "text_type", "url", "children")
+
+    # children is only set on bold and italic nodes with other inline nodes
+    # inside them (for example a link or italic text in bold), their text is
+    # None then
+    def __init__(self, text: str, text_type: TextType, url: str = None, children: list = None):
         self.text = text
         self.text_type = text_type
         self.url = url
+        self.children = children
 
     def __eq__(self, other):
         if not isinstance(other, TextNode):
             return False
-        return self.text == other.text and self.text_type == other.text_type and self.url == other.url  
+        return (self.text == other.text and self.text_type == other.text_type
+                and self.url == other.url and self.children == other.children)
 
     def __repr__(self):
+        if self.children is not None:
+            return f"TextNode({self.text}, {self.text_type.value}, {self.url}, {self.children})"
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
+
+
+# _text of a view whose text was not sliced yet (None is a valid text)
+_UNSLICED = object()
+
+class TextNodeView(TextNode):
+    # A TextNode whose text is source[start:end]. Inline parsing makes
+    # these instead of copying every piece of a paragraph out of it; the
+    # text is sliced the first time it is read and kept from then on.
+    # Compares, prints and pickles exactly like a TextNode with that text.
+    __slots__ = ("source", "start", "end", "_text")
+
+    def __init__(self, source: str, start: int, end: int, text_type: TextType, url: str = None):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.text_type = text_type
+        self.url = url
+        self.children = None
+        self._text = _UNSLICED
+
+    @property
+    def text(self):
+        text = self._text
+        if text is _UNSLICED:
+            text = self._text = self.source[self.start:self.end]
+        return text
+
+    @text.setter
+    def text(self, value):
+        self._text = value
+        self.source, self.start, self.end = value, 0, len(value) if value is not None else 0
+
+    def __reduce__(self):
+        # Sending a view to another process sends its text, not the source
+        return TextNode, (self.text, self.text_type, self.url, self.children)
+
+# Shorter pieces are copied: for them a view, with three more slots and
+# two int offsets, is bigger than the string, and reading its text through
+# the property costs more than the slice it saved
+VIEW_MIN_LENGTH = 64
+
+def text_piece(source, start, end, text_type, url=None):
+    # A node for source[start:end], a view when the piece is long
+    if end - start < VIEW_MIN_LENGTH:
+        return TextNode(source[start:end], text_type, url)
+    return TextNodeView(source, start, end, text_type, url)
+
+def text_span(text_node):
+    # (source, start, end) of a node's text, without copying a view's text
+    if isinstance(text_node, TextNodeView):
+        return text_node.source, text_node.start, text_node.end
+    return text_node.text, 0, len(text_node.text)
     
     
+# TextType -> function building the LeafNode for a TextNode
+_HTML_NODE_BUILDERS = {
+    TextType.TEXT: lambda node: LeafNode(None, node.text),
+    TextType.BOLD: lambda node: LeafNode("b", node.text),
+    TextType.ITALIC: lambda node: LeafNode("i", node.text),
+    TextType.CODE: lambda node: LeafNode("code", node.text),
+    TextType.LINK: lambda node: LeafNode("a", node.text, props={"href": node.url}),
+    TextType.IMAGE: lambda node: LeafNode("img", "", props={"src": node.url, "alt": node.text}),
+}
+
+# TextType -> tag of a TextNode that has children
+_NESTING_TAGS = {
+    TextType.BOLD: "b",
+    TextType.ITALIC: "i",
+}
+
+def nesting_tag(text_node):
+    tag = _NESTING_TAGS.get(text_node.text_type)
+    if tag is None:
+        raise ValueError(f"TextType {text_node.text_type.value} can not have children")
+    return tag
+
 def text_node_to_html_node(text_node):
-    if text_node.text_type == TextType.TEXT:
-        return LeafNode(None, text_node.text)
-    elif text_node.text_type == TextType.BOLD:
-        return LeafNode("b", text_node.text)
-    elif text_node.text_type == TextType.ITALIC:
-        return LeafNode("i", text_node.text)
-    elif text_node.text_type == TextType.CODE:
-        return LeafNode("code", text_node.text)
-    elif text_node.text_type == TextType.LINK:
-        return LeafNode("a", text_node.text, props={"href": text_node.url})
-    elif text_node.text_type == TextType.IMAGE:
-        return LeafNode("img", "", props={"src": text_node.url, "alt": text_node.text})
-    else:
-        raise ValueError(f"Unsupported TextType")
\ No newline at end of file
+    if text_node.children is not None:
+        children = [text_node_to_html_node(child) for child in text_node.children]
+        return ParentNode(nesting_tag(text_node), children)
+    build = _HTML_NODE_BUILDERS.get(text_node.text_type)
+    if build is None:
+        raise ValueError(f"Unsupported TextType")
+    return build(text_node)
+
+# TextType -> function rendering a TextNode straight to HTML, for callers
+# that only want the markup and never look at the LeafNode. The output is
+# the same as text_node_to_html_node(node).to_html(), escaping included.
+_HTML_RENDERERS = {
+    TextType.TEXT: lambda node: escape_html(node.text),
+    TextType.BOLD: lambda node: f"<b>{escape_html(node.text)}</b>",
+    TextType.ITALIC: lambda node: f"<i>{escape_html(node.text)}</i>",
+    TextType.CODE: lambda node: f"<code>{escape_html(node.text)}</code>",
+    TextType.LINK: lambda node: f'<a href="{escape_html(str(node.url))}">{escape_html(node.text)}</a>',
+    TextType.IMAGE: lambda node: f'<img src="{escape_html(str(node.url))}" alt="{escape_html(str(node.text))}"/>',
+}
+
+def text_node_to_html(text_node):
+    if text_node.children is not None:
+        return text_nodes_to_html([text_node])
+    render = _HTML_RENDERERS.get(text_node.text_type)
+    if render is None:
+        raise ValueError(f"Unsupported TextType")
+    # Like LeafNode.to_html, only an image renders without a value
+    if text_node.text is None and text_node.text_type is not TextType.IMAGE:
+        raise ValueError("LeafNode must have a value")
+    return render(text_node)
+
+def text_nodes_to_html(text_nodes):
+    renderers = _HTML_RENDERERS
+    parts = []
+    for node in text_nodes:
+        if node.children is not None:
+            tag = nesting_tag(node)
+            parts.append(f"<{tag}>{text_nodes_to_html(node.children)}</{tag}>")
+            continue
+        render = renderers.get(node.text_type)
+        if render is None:
+            raise ValueError(f"Unsupported TextType")
+        if node.text is None and node.text_type is not TextType.IMAGE:
+            raise ValueError("LeafNode must have a value")
+        parts.append(render(node))
+    return "".join(parts)